@@ -0,0 +1,9 @@
+"""
+    benchmarks
+    ~~~~~~~~~~
+
+    Benchmark suite for Config-Loader project
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
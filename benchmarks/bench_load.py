@@ -0,0 +1,202 @@
+"""
+    benchmarks.bench_load
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Benchmark every stage of the configuration loading pipeline on synthetic configurations
+
+    Run it with
+
+    .. code-block:: sh
+
+        $ python -m benchmarks.bench_load
+        $ python -m benchmarks.bench_load --quick --json results.json
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections import namedtuple
+
+import yaml
+from marshmallow import fields
+
+from cfg_loader import ConfigSchema, YamlConfigLoader
+from cfg_loader.fields import UnwrapNested
+from cfg_loader.interpolator import Interpolator, SubstitutionTemplate, compile_template
+from cfg_loader.utils import parse_yaml_file, YAML_LOADERS
+
+Scenario = namedtuple('Scenario', ['name', 'sections', 'keys', 'depth', 'placeholder_ratio', 'unwrap'])
+
+SCENARIOS = [
+    Scenario('small', sections=2, keys=10, depth=1, placeholder_ratio=0.2, unwrap=False),
+    Scenario('wide', sections=20, keys=50, depth=1, placeholder_ratio=0.1, unwrap=False),
+    Scenario('deep', sections=2, keys=5, depth=8, placeholder_ratio=0.1, unwrap=False),
+    Scenario('dense', sections=10, keys=50, depth=2, placeholder_ratio=0.9, unwrap=False),
+    Scenario('static', sections=10, keys=50, depth=2, placeholder_ratio=0.0, unwrap=False),
+    Scenario('unwrap', sections=10, keys=50, depth=2, placeholder_ratio=0.2, unwrap=True),
+]
+
+QUICK_SCENARIOS = ['small', 'deep', 'unwrap']
+
+# Number of distinct variables referenced by placeholders
+VARIABLES = 50
+
+SUBSTITUTION_MAPPING = {'VAR_{}'.format(index): 'value-{}'.format(index) for index in range(VARIABLES)}
+
+
+def generate_value(rng, index, placeholder_ratio):
+    if rng.random() >= placeholder_ratio:
+        return 'static-value-{}'.format(index)
+
+    var = 'VAR_{}'.format(rng.randrange(VARIABLES * 2))
+    return rng.choice(['${{{}:-default}}'.format(var), '/path/${{{}-default}}/file'.format(var), '$$escaped'])
+
+
+def generate_document(scenario, seed=0):
+    """Generate a synthetic configuration document
+
+    Each section holds `keys` leaves and `sections` sub-sections down to `depth`.
+    """
+    rng = random.Random(seed)
+
+    def generate(depth):
+        document = {'key_{}'.format(index): generate_value(rng, index, scenario.placeholder_ratio)
+                    for index in range(scenario.keys)}
+        if depth > 0:
+            document.update({'section_{}'.format(index): generate(depth - 1) for index in range(scenario.sections)})
+        return document
+
+    return generate(scenario.depth)
+
+
+def generate_schema(scenario):
+    """Generate a configuration schema matching documents generated for a scenario
+
+    Half of the leaves are declared, the other half go through as extra fields.
+    """
+
+    def generate(depth):
+        attrs = {'key_{}'.format(index): fields.Str() for index in range(0, scenario.keys, 2)}
+        if depth > 0:
+            child = generate(depth - 1)
+            for index in range(scenario.sections):
+                if scenario.unwrap and depth == scenario.depth:
+                    attrs['section_{}'.format(index)] = UnwrapNested(child, prefix='section_{}_'.format(index))
+                else:
+                    attrs['section_{}'.format(index)] = fields.Nested(child)
+        return type('Level{}Schema'.format(depth), (ConfigSchema,), attrs)
+
+    return generate(scenario.depth)
+
+
+def iter_strings(obj):
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from iter_strings(value)
+    elif isinstance(obj, list):
+        for element in obj:
+            yield from iter_strings(element)
+
+
+def measure(func, repeat, number):
+    """Return the best time per call in seconds and the peak memory allocated by one call in bytes"""
+    best = min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def bench_scenario(scenario, config_file, repeat, number):
+    document = generate_document(scenario)
+    schema_class = generate_schema(scenario)
+    strings = list(iter_strings(document))
+    interpolator = Interpolator(substitution_mapping=SUBSTITUTION_MAPPING)
+    loader = YamlConfigLoader(schema_class, substitution_mapping=SUBSTITUTION_MAPPING)
+
+    with open(config_file, 'w') as f:
+        yaml.safe_dump(document, f)
+
+    def substitute_uncached():
+        compile_template.cache_clear()
+        for string in strings:
+            SubstitutionTemplate(string).substitute(SUBSTITUTION_MAPPING)
+
+    def substitute():
+        for string in strings:
+            SubstitutionTemplate(string).substitute(SUBSTITUTION_MAPPING)
+
+    stages = [
+        ('substitute (cold)', substitute_uncached),
+        ('substitute', substitute),
+        ('interpolate_recursive', lambda: interpolator.interpolate_recursive(document)),
+    ]
+    stages += [('parse_yaml_file ({})'.format(backend), lambda backend=backend: parse_yaml_file(config_file, backend))
+               for backend in sorted(YAML_LOADERS)]
+    stages += [
+        ('ConfigSchema()', lambda: schema_class(substitution_mapping=SUBSTITUTION_MAPPING)),
+        ('ConfigSchema.load', lambda: schema_class(substitution_mapping=SUBSTITUTION_MAPPING).load(document)),
+        ('YamlConfigLoader.load', lambda: loader.load(config_file)),
+    ]
+
+    results = []
+    for stage, func in stages:
+        seconds, peak = measure(func, repeat, number)
+        results.append({'scenario': scenario.name, 'stage': stage, 'seconds': seconds, 'peak_memory': peak,
+                        'strings': len(strings), 'file_size': os.path.getsize(config_file)})
+    return results
+
+
+def format_results(results):
+    lines = ['{:<10} {:<26} {:>8} {:>10} {:>12} {:>12}'.format('scenario', 'stage', 'strings', 'file (kB)',
+                                                               'time (ms)', 'peak (kB)')]
+    for result in results:
+        lines.append('{:<10} {:<26} {:>8} {:>10.1f} {:>12.3f} {:>12.1f}'.format(
+            result['scenario'], result['stage'], result['strings'], result['file_size'] / 1024,
+            result['seconds'] * 1000, result['peak_memory'] / 1024,
+        ))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the configuration loading pipeline')
+    parser.add_argument('--quick', action='store_true', help='run a reduced set of scenarios')
+    parser.add_argument('--scenario', action='append', choices=[scenario.name for scenario in SCENARIOS],
+                        help='scenario to run (can be repeated)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing repetitions')
+    parser.add_argument('--number', type=int, default=3, help='number of calls per repetition')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON to PATH')
+    args = parser.parse_args(argv)
+
+    names = args.scenario or (QUICK_SCENARIOS if args.quick else [scenario.name for scenario in SCENARIOS])
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scenario in SCENARIOS:
+            if scenario.name in names:
+                results += bench_scenario(scenario, os.path.join(tmpdir, 'config.yml'), args.repeat, args.number)
+
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
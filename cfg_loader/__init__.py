@@ -8,7 +8,7 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
-from .loader import BaseConfigLoader, YamlConfigLoader
+from .loader import BaseConfigLoader, FileConfigLoader, YamlConfigLoader, LayeredConfigLoader
 from .schema import ConfigSchema
 
 __version__ = '0.3.0-dev'
@@ -16,5 +16,7 @@ __version__ = '0.3.0-dev'
 __all__ = [
     'ConfigSchema',
     'BaseConfigLoader',
+    'FileConfigLoader',
     'YamlConfigLoader',
+    'LayeredConfigLoader',
 ]
@@ -0,0 +1,435 @@
+"""
+    cfg_loader.cache
+    ~~~~~~~~~~~~~~~~
+
+    Implement caches used to avoid redundant work across loads
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import concurrent.futures
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .utils import file_fingerprint, mapping_fingerprint, map_file
+
+# Default number of seconds after which a cached stat result expires
+DEFAULT_STAT_TTL = 1.0
+
+
+class LRUCache:
+    """Thread-safe bounded cache discarding least recently used entries first
+
+    :param maxsize: Maximum number of entries (``0`` disables caching)
+    :type maxsize: int
+    :param ttl: Optional number of seconds after which an entry expires
+    :type ttl: float
+
+    Example
+
+    >>> cache = LRUCache(maxsize=1)
+    >>> cache.get_or_set('key', lambda: 'value')
+    'value'
+    >>> cache.get('key')
+    'value'
+    >>> cache.set('other', 'value')
+    >>> cache.get('key') is None
+    True
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries and not self._is_expired(self._entries[key])
+
+    def __getstate__(self):
+        # Entries and lock are not shared with other processes
+        state = self.__dict__.copy()
+        del state['_entries'], state['_lock']
+        state.update(hits=0, misses=0)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _is_expired(self, entry):
+        return entry[1] is not None and entry[1] <= time.monotonic()
+
+    def get(self, key, default=None):
+        """Return the value cached for key or default
+
+        :param key: Key of the entry
+        :type key: hashable
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Cache value for key, evicting least recently used entries if the cache is full
+
+        :param key: Key of the entry
+        :type key: hashable
+        :param value: Value to cache
+        :type value: object
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """Return the value cached for key, computing and caching it with factory on a miss
+
+        The factory runs outside of the cache lock so concurrent misses may compute the value
+        more than once.
+
+        :param key: Key of the entry
+        :type key: hashable
+        :param factory: Callable computing the value
+        :type factory: callable
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Remove the entry for key if any
+
+        :param key: Key of the entry
+        :type key: hashable
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class ConfigCache(LRUCache):
+    """Cache of loaded configurations keyed by configuration file, substitution mapping and loader
+
+    Entries are keyed by the file modification time and size or, if `content_hash` is set,
+    by a hash of the file content so an updated file is never served from the cache.
+    Loaders sharing a cache only get back configurations loaded with the same schema and options.
+    Cached configurations are shared between loads and should not be mutated (loaders created
+    with ``frozen=True`` return immutable configurations).
+
+    :param maxsize: Maximum number of entries (``0`` disables caching)
+    :type maxsize: int
+    :param ttl: Optional number of seconds after which an entry expires
+    :type ttl: float
+    :param content_hash: Whether to key entries by file content hash instead of file metadata
+    :type content_hash: bool
+    """
+
+    def __init__(self, maxsize=128, ttl=None, content_hash=False):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.content_hash = content_hash
+
+    def key_for(self, path, substitution_mapping, loader_key=None):
+        """Return the cache key of a load or ``None`` if the load can not be cached
+
+        :param path: Path to the configuration file
+        :type path: str
+        :param substitution_mapping: Mapping with values to substitute
+        :type substitution_mapping: dict
+        :param loader_key: Hashable identifying the schema and options of the loader
+            (c.f. :meth:`~cfg_loader.loader.FileConfigLoader.cache_key`)
+        :type loader_key: tuple
+        """
+        mapping_key = mapping_fingerprint(substitution_mapping)
+        if mapping_key is None:
+            return None
+
+        return (os.path.abspath(path), file_fingerprint(path, content_hash=self.content_hash), mapping_key,
+                loader_key)
+
+    def invalidate_path(self, path):
+        """Remove every entry loaded from path
+
+        :param path: Path to the configuration file
+        :type path: str
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+
+class StatCache(LRUCache):
+    """Cache of ``os.stat`` results shared by path validations
+
+    Missing paths are cached as ``None``. Results are kept for `ttl` seconds so a path
+    created or removed in the meantime may be reported with a stale status.
+
+    :param maxsize: Maximum number of entries (``0`` disables caching)
+    :type maxsize: int
+    :param ttl: Number of seconds after which a result expires
+    :type ttl: float
+    :param max_workers: Number of threads used by :meth:`prefetch`, stat calls are issued sequentially
+        by default
+    :type max_workers: int
+    :param executor: Optional executor used by :meth:`prefetch` instead of a thread pool of `max_workers`
+        threads created on first use
+    :type executor: :class:`concurrent.futures.Executor`
+
+    Example
+
+    >>> cache = StatCache()
+    >>> cache.stat('.').st_mode > 0
+    True
+    >>> cache.stat('unknown') is None
+    True
+    """
+
+    def __init__(self, maxsize=4096, ttl=DEFAULT_STAT_TTL, max_workers=1, executor=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.max_workers = max_workers
+        self.executor = executor
+        self._executor = None
+
+    def __getstate__(self):
+        # Executors are not shared with other processes
+        state = super().__getstate__()
+        state.update(executor=None, _executor=None)
+        return state
+
+    def get_executor(self):
+        """Return the executor used by :meth:`prefetch` or ``None`` if stat calls are sequential
+
+        The thread pool is created on first use and reused by every following prefetch.
+        """
+        if self.executor is not None:
+            return self.executor
+
+        if self.max_workers == 1:
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def stat(self, path):
+        """Return the stat result of a path or ``None`` if it does not exist
+
+        :param path: Path to stat
+        :type path: str
+        """
+        return self.get_or_set(path, lambda: _stat(path))
+
+    def prefetch(self, paths):
+        """Stat every path not cached yet, concurrently if the cache has an executor
+
+        Concurrent stat calls are useful on network filesystems with high syscall latency,
+        on local filesystems sequential calls are faster.
+
+        :param paths: Paths to stat
+        :type paths: iterable
+        """
+        paths = [path for path in OrderedDict.fromkeys(paths) if path not in self]
+        executor = self.get_executor() if len(paths) > 1 else None
+        results = map(_stat, paths) if executor is None else list(executor.map(_stat, paths))
+
+        for path, result in zip(paths, results):
+            self.set(path, result)
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
+class ParseCache:
+    """Persistent cache of parsed files stored on disk and keyed by file content hash
+
+    Entries are written atomically so concurrent processes can share the same cache directory.
+    A modified file gets a new content hash so stale entries are never returned. The key of the
+    last entry of every file is recorded so the entry of a previous version is removed when a
+    modified file is parsed.
+    Entries are pickled: the cache directory must only be writable by trusted users.
+
+    :param cache_dir: Directory holding cache entries (created if it does not exist)
+    :type cache_dir: str
+    :param namespace: Namespace of the entries, entries from different parsers must not share a namespace
+    :type namespace: str
+    """
+
+    suffix = '.pickle'
+    index_suffix = '.last'
+
+    def __init__(self, cache_dir, namespace='yaml'):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+
+    def key_for(self, content, namespace=None):
+        """Return the key of an entry for a file content
+
+        :param content: Raw file content
+        :type content: bytes | mmap.mmap
+        :param namespace: Namespace of the entry, defaults to the cache namespace
+        :type namespace: str
+        """
+        digest = hashlib.sha256((namespace or self.namespace).encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        """Return the path of the entry with key
+
+        :param key: Key of the entry
+        :type key: str
+        """
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def index_path_for(self, path, namespace=None):
+        """Return the path of the record holding the key of the last entry of a file
+
+        :param path: Path to the file
+        :type path: str
+        :param namespace: Namespace of the entry, defaults to the cache namespace
+        :type namespace: str
+        """
+        digest = hashlib.sha256((namespace or self.namespace).encode())
+        digest.update(os.fsencode(os.path.abspath(path)))
+        return os.path.join(self.cache_dir, digest.hexdigest() + self.index_suffix)
+
+    def get(self, key, default=None):
+        """Return the parsed data stored with key or default
+
+        Unreadable entries are removed and reported as missing.
+
+        :param key: Key of the entry
+        :type key: str
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except Exception:
+            self._remove(path)
+            return default
+
+    def set(self, key, data):
+        """Store parsed data with key
+
+        :param key: Key of the entry
+        :type key: str
+        :param data: Parsed data
+        :type data: object
+        """
+        self._write(self.path_for(key), lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load(self, path, parser, namespace=None):
+        """Return the parsed content of a file, parsing it only if it is not cached
+
+        :param path: Path to the file
+        :type path: str
+        :param parser: Callable parsing raw file content
+        :type parser: callable
+        :param namespace: Namespace of the entry, defaults to the cache namespace
+        :type namespace: str
+        """
+        with map_file(path) as content:
+            key = self.key_for(content, namespace)
+            missing = object()
+            data = self.get(key, missing)
+            if data is not missing:
+                return data
+
+            data = parser(content)
+
+        try:
+            self.set(key, data)
+            self._evict_previous(path, namespace, key)
+        except OSError:
+            # A cache that can not be written must not prevent loading
+            pass
+
+        return data
+
+    def _evict_previous(self, path, namespace, key):
+        # Remove the entry of the previous version of the file (files with identical content share
+        # entries so another file may have to parse again)
+        index_path = self.index_path_for(path, namespace)
+        try:
+            with open(index_path) as f:
+                previous = f.read()
+        except OSError:
+            previous = None
+
+        if previous == key:
+            return
+
+        self._write(index_path, lambda f: f.write(key.encode()))
+        if previous and previous.isalnum():
+            self._remove(self.path_for(previous))
+
+    def clear(self):
+        """Remove every entry"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((self.suffix, self.index_suffix)):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _write(self, path, write):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -25,6 +25,10 @@ class LoadingError(ConfigLoaderError):
     """Error raised when loading the configuration file"""
 
 
+class UnsupportedFormatError(LoadingError):
+    """Error raised when no parser is registered for a configuration file format"""
+
+
 class ValidationError(ConfigLoaderError):
     """Error raised when marshmallow raise a validation error at deserialization"""
 
@@ -35,3 +39,7 @@ class UnsetRequiredSubstitution(LoadingError):
 
 class InvalidSubstitution(LoadingError):
     """Error raised when an invalid substitution is detected"""
+
+
+class CircularReferenceError(LoadingError):
+    """Error raised when input data contains itself (e.g. through recursive YAML aliases)"""
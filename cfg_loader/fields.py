@@ -9,49 +9,182 @@
 """
 
 import os
+import stat
 
 from marshmallow import validate, fields
 
+from .cache import StatCache
+
+# Kinds of path a path validator can require
+KIND_FILE = 'file'
+KIND_DIRECTORY = 'directory'
+
 
 class PathValidator(validate.Validator):
     """Validate a path.
 
+    Every check relies on a single ``stat`` call, whose result is shared with other validations
+    when a stat cache is provided.
+
     :param error: Error message to raise in case of a validation error. Can be
         interpolated with `{input}`.
     :type error: str
+    :param kind: Optional kind of path required (``'file'`` or ``'directory'``)
+    :type kind: str
+    :param readable: Whether to require the path to be readable according to its permission bits
+    :type readable: bool
+    :param stat_cache: Optional cache of stat results
+    :type stat_cache: :class:`~cfg_loader.cache.StatCache`
+    :param error_messages: Error messages overriding :attr:`default_messages`
+    :type error_messages: dict
     """
 
     default_message = 'Path "{input}" does not exist'
 
-    def __init__(self, error=None):
+    default_messages = {
+        'not_a_file': 'Path "{input}" is not a file',
+        'not_a_directory': 'Path "{input}" is not a directory',
+        'not_readable': 'Path "{input}" is not readable',
+    }
+
+    def __init__(self, error=None, kind=None, readable=False, stat_cache=None, error_messages=None):
+        if kind not in (None, KIND_FILE, KIND_DIRECTORY):
+            raise ValueError('Invalid path kind: {}'.format(kind))
+
         self.error = error or self.default_message
+        self.kind = kind
+        self.readable = readable
+        self.stat_cache = stat_cache
+        self.error_messages = dict(self.default_messages, **(error_messages or {}))
+
+    def _format_error(self, value, error=None):
+        return (error or self.error).format(input=value)
+
+    def stat(self, value):
+        """Return the stat result of a path or ``None`` if it does not exist
+
+        :param value: Path to stat
+        :type value: str
+        """
+        if self.stat_cache is not None:
+            return self.stat_cache.stat(value)
 
-    def _format_error(self, value):
-        return self.error.format(input=value)
+        try:
+            return os.stat(value)
+        except (OSError, ValueError):
+            return None
 
     def __call__(self, value):
-        message = self._format_error(value)
+        st = self.stat(value)
 
-        if not os.path.exists(value):
-            raise validate.ValidationError(message)
+        if st is None:
+            raise validate.ValidationError(self._format_error(value))
+
+        if self.kind == KIND_FILE and not stat.S_ISREG(st.st_mode):
+            raise validate.ValidationError(self._format_error(value, self.error_messages['not_a_file']))
+
+        if self.kind == KIND_DIRECTORY and not stat.S_ISDIR(st.st_mode):
+            raise validate.ValidationError(self._format_error(value, self.error_messages['not_a_directory']))
+
+        if self.readable and not is_readable(st):
+            raise validate.ValidationError(self._format_error(value, self.error_messages['not_readable']))
 
         return value
 
 
+def is_readable(st):
+    """Return whether the current process can read a path from its stat result
+
+    It only checks permission bits (ACLs and other access control mechanisms are ignored).
+
+    :param st: Stat result of the path
+    :type st: os.stat_result
+    """
+    if not hasattr(os, 'geteuid'):  # pragma: no cover
+        return bool(st.st_mode & stat.S_IRUSR)
+
+    euid = os.geteuid()
+    if euid == 0:
+        return True
+    if st.st_uid == euid:
+        return bool(st.st_mode & stat.S_IRUSR)
+    if st.st_gid == os.getegid() or st.st_gid in os.getgroups():
+        return bool(st.st_mode & stat.S_IRGRP)
+    return bool(st.st_mode & stat.S_IROTH)
+
+
 class Path(fields.String):
     """A validated path field. Validation occurs during both serialization and
     deserialization.
 
+    :param kind: Optional kind of path required (``'file'`` or ``'directory'``)
+    :type kind: str
+    :param readable: Whether to require the path to be readable
+    :type readable: bool
+    :param stat_cache: Optional cache of stat results shared across fields and loads
+    :type stat_cache: :class:`~cfg_loader.cache.StatCache`
     :param args: The same positional arguments that :class:`~marshmallow.fields.String` receives.
     :param kwargs: The same keyword arguments that :class:`~marshmallow.fields.String` receives.
     """
 
-    default_error_messages = {'invalid_path': 'Path "{input}" does not exist'}
+    default_error_messages = {
+        'invalid_path': 'Path "{input}" does not exist',
+        'not_a_file': 'Path "{input}" is not a file',
+        'not_a_directory': 'Path "{input}" is not a directory',
+        'not_readable': 'Path "{input}" is not readable',
+    }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, kind=None, readable=False, stat_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
         # Insert validation into self.validators so that multiple errors can be
-        self.validators.append(PathValidator(error=self.error_messages['invalid_path']))
+        self.path_validator = PathValidator(
+            error=self.error_messages['invalid_path'],
+            kind=kind,
+            readable=readable,
+            stat_cache=stat_cache,
+            error_messages=self.error_messages,
+        )
+        self.validators.append(self.path_validator)
+
+
+class PathList(fields.List):
+    """A list of validated paths
+
+    Unique paths are stat in a batch before elements are validated from the stat cache, concurrently
+    if the stat cache has an executor. Without a shared stat cache, every path is stat once per load.
+
+    :param kind: Optional kind of path required (``'file'`` or ``'directory'``)
+    :type kind: str
+    :param readable: Whether to require paths to be readable
+    :type readable: bool
+    :param stat_cache: Optional cache of stat results shared across fields and loads
+    :type stat_cache: :class:`~cfg_loader.cache.StatCache`
+    :param kwargs: The same keyword arguments that :class:`~marshmallow.fields.List` receives.
+
+    Example
+
+    >>> from marshmallow import Schema
+
+    >>> class MySchema(Schema):
+    ...     directories = PathList(kind='directory')
+
+    >>> MySchema().load({'directories': ['.', '..']})
+    {'directories': ['.', '..']}
+    """
+
+    def __init__(self, kind=None, readable=False, stat_cache=None, **kwargs):
+        self._private_stat_cache = stat_cache is None
+        self.stat_cache = StatCache(ttl=None) if stat_cache is None else stat_cache
+        super().__init__(Path(kind=kind, readable=readable, stat_cache=self.stat_cache), **kwargs)
+
+    def _deserialize(self, value, attr, data):
+        if self._private_stat_cache:
+            self.stat_cache.clear()
+
+        if isinstance(value, (list, tuple)):
+            self.stat_cache.prefetch(element for element in value if isinstance(element, str))
+
+        return super()._deserialize(value, attr, data)
 
 
 class UnwrapNested(fields.Nested):
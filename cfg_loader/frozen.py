@@ -0,0 +1,118 @@
+"""
+    cfg_loader.frozen
+    ~~~~~~~~~~~~~~~~~
+
+    Implement immutable configuration objects
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+from collections.abc import Mapping
+
+
+class FrozenConfig(Mapping):
+    """Immutable configuration mapping with attribute access
+
+    Instances can be safely shared between threads without copying.
+
+    :param data: Dictionary with already frozen values
+    :type data: dict
+
+    Example
+
+    >>> config = freeze({'db': {'host': 'localhost', 'ports': [5432]}})
+    >>> config.db.host
+    'localhost'
+    >>> config['db']['ports']
+    (5432,)
+    >>> config.db.host = 'other'
+    Traceback (most recent call last):
+    ...
+    AttributeError: FrozenConfig is immutable
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        object.__setattr__(self, '_data', data)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is immutable'.format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is immutable'.format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return self.__class__, (self._data,)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._data)
+
+    def thaw(self):
+        """Return a mutable deep copy of the configuration made of dictionaries and lists"""
+        return thaw(self)
+
+
+def freeze(obj, memo=None):
+    """Return an immutable version of an object
+
+    Dictionaries are converted to :class:`FrozenConfig`, lists to tuples and sets to frozensets.
+    Already frozen subtrees are reused as is and subtrees shared in obj are frozen once.
+
+    :param obj: Object to freeze
+    :type obj: object
+    """
+    if isinstance(obj, (FrozenConfig, str, bytes, int, float, bool, type(None))):
+        return obj
+
+    memo = {} if memo is None else memo
+    try:
+        return memo[id(obj)]
+    except KeyError:
+        pass
+
+    if isinstance(obj, dict):
+        frozen = FrozenConfig({key: freeze(value, memo) for key, value in obj.items()})
+    elif isinstance(obj, (list, tuple)):
+        frozen = tuple(freeze(element, memo) for element in obj)
+    elif isinstance(obj, (set, frozenset)):
+        frozen = frozenset(freeze(element, memo) for element in obj)
+    else:
+        return obj
+
+    memo[id(obj)] = frozen
+    return frozen
+
+
+def thaw(obj):
+    """Return a mutable deep copy of a frozen object
+
+    :param obj: Object to thaw
+    :type obj: object
+    """
+    if isinstance(obj, FrozenConfig):
+        return {key: thaw(value) for key, value in obj.items()}
+    elif isinstance(obj, tuple):
+        return [thaw(element) for element in obj]
+    elif isinstance(obj, frozenset):
+        return {thaw(element) for element in obj}
+    return obj
@@ -0,0 +1,244 @@
+"""
+    cfg_loader.instrumentation
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Implement instrumentation of the configuration loading pipeline
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import contextlib
+import threading
+import time
+from collections import Counter
+
+# Stages of the loading pipeline
+STAGE_LOAD = 'load'
+STAGE_CHECK_FILE = 'check_file'
+STAGE_PARSE = 'parse'
+STAGE_INTERPOLATE = 'interpolate'
+STAGE_VALIDATE = 'validate'
+
+
+class Instrumentation:
+    """Base class receiving events of the configuration loading pipeline
+
+    Every hook does nothing, subclasses override the hooks they are interested in. Stages are
+
+    - ``'load'``: whole load of a configuration
+    - ``'check_file'``: resolution and validity check of the configuration file path
+    - ``'parse'``: parsing of a configuration file
+    - ``'interpolate'``: substitution of variables into input data
+    - ``'validate'``: deserialization and validation of input data by the schema
+
+    Hooks may be called concurrently when a loader is used from many threads.
+    """
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager timing a stage and reporting it to :meth:`on_stage`
+
+        :param name: Name of the stage
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.on_stage(name, time.perf_counter() - start, failed=True)
+            raise
+        self.on_stage(name, time.perf_counter() - start, failed=False)
+
+    def on_stage(self, name, duration, failed):
+        """Called when a stage completes
+
+        :param name: Name of the stage
+        :type name: str
+        :param duration: Duration of the stage in seconds
+        :type duration: float
+        :param failed: Whether the stage raised an exception
+        :type failed: bool
+        """
+
+    def on_bytes_read(self, path, size):
+        """Called when a configuration file is parsed
+
+        :param path: Path to the configuration file
+        :type path: str
+        :param size: Size of the file in bytes
+        :type size: int
+        """
+
+    def on_substitutions(self, stats):
+        """Called after interpolation with statistics of the placeholders substituted
+
+        :param stats: Statistics of the substitutions of one load
+        :type stats: :class:`~cfg_loader.interpolator.SubstitutionStats`
+        """
+
+    def on_validation_errors(self, count):
+        """Called when validation fails with the number of error messages
+
+        :param count: Number of error messages
+        :type count: int
+        """
+
+
+class StageMetrics:
+    """Aggregated durations of a stage"""
+
+    __slots__ = ('count', 'failures', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self):
+        """Mean duration in seconds"""
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {'count': self.count, 'failures': self.failures, 'total': self.total, 'max': self.max,
+                'mean': self.mean}
+
+
+class MetricsCollector(Instrumentation):
+    """Instrumentation aggregating metrics in memory
+
+    Besides stage durations, it counts how many times each variable has been referenced
+    (``variables``), fell back to its default value (``defaulted``) or was missing from the mapping
+    (``missing``) and reports mapping variables never referenced by any load (:attr:`unused_variables`).
+
+    Metrics collected in other processes (e.g. by :meth:`~cfg_loader.loader.FileConfigLoader.load_many`)
+    are not reported back.
+
+    Example
+
+    >>> from cfg_loader import ConfigSchema, BaseConfigLoader
+    >>> from marshmallow import fields
+
+    >>> class MyConfigSchema(ConfigSchema):
+    ...     setting = fields.Str()
+
+    >>> metrics = MetricsCollector()
+    >>> loader = BaseConfigLoader(MyConfigSchema, {'VARIABLE': 'value'}, instrumentation=metrics)
+    >>> loader.load({'setting': '${VARIABLE}'})
+    {'setting': 'value'}
+    >>> metrics.stages['validate'].count
+    1
+    >>> metrics.substitutions
+    1
+    >>> metrics.variables
+    Counter({'VARIABLE': 1})
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        # Lock can not be pickled and metrics are not shared with other processes
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def reset(self):
+        """Discard collected metrics"""
+        with self._lock:
+            self.stages = {}
+            self.bytes_read = 0
+            self.substitutions = 0
+            self.validation_errors = 0
+            self.variables = Counter()
+            self.defaulted = Counter()
+            self.missing = Counter()
+            self._mapping_variables = set()
+
+    @property
+    def unused_variables(self):
+        """Variables of the substitution mappings that were never referenced"""
+        with self._lock:
+            return self._mapping_variables - set(self.variables)
+
+    def on_stage(self, name, duration, failed):
+        with self._lock:
+            metrics = self.stages.get(name)
+            if metrics is None:
+                metrics = self.stages[name] = StageMetrics()
+            metrics.count += 1
+            metrics.failures += failed
+            metrics.total += duration
+            metrics.max = max(metrics.max, duration)
+
+    def on_bytes_read(self, path, size):
+        with self._lock:
+            self.bytes_read += size
+
+    def on_substitutions(self, stats):
+        with self._lock:
+            self.substitutions += stats.total
+            self.variables.update(stats.used)
+            self.defaulted.update(stats.defaulted)
+            self.missing.update(stats.missing)
+            self._mapping_variables.update(stats.mapping)
+
+    def on_validation_errors(self, count):
+        with self._lock:
+            self.validation_errors += count
+
+    def snapshot(self):
+        """Return collected metrics as a dictionary of plain values"""
+        with self._lock:
+            return {
+                'stages': {name: metrics.as_dict() for name, metrics in self.stages.items()},
+                'bytes_read': self.bytes_read,
+                'substitutions': self.substitutions,
+                'validation_errors': self.validation_errors,
+                'variables': dict(self.variables),
+                'defaulted': dict(self.defaulted),
+                'missing': dict(self.missing),
+                'unused_variables': sorted(self._mapping_variables - set(self.variables)),
+            }
+
+
+class _NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(instrumentation, name):
+    """Return a context manager timing a stage with instrumentation or doing nothing if it is ``None``
+
+    :param instrumentation: Instrumentation receiving the stage
+    :type instrumentation: :class:`Instrumentation`
+    :param name: Name of the stage
+    :type name: str
+    """
+    if instrumentation is None:
+        return _NULL_STAGE
+    return instrumentation.stage(name)
+
+
+def count_errors(messages):
+    """Return the number of error messages in normalized marshmallow messages
+
+    >>> count_errors({'setting': ['Not a valid integer.'], 'db': {'port': ['Missing data.', 'Invalid.']}})
+    3
+    """
+    if isinstance(messages, dict):
+        return sum(count_errors(value) for value in messages.values())
+    elif isinstance(messages, (list, tuple)):
+        return sum(count_errors(value) for value in messages)
+    return 1
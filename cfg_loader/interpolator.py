@@ -8,10 +8,14 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
+import functools
+import operator
 import re
 import string
+from collections import Counter, namedtuple
+from collections.abc import Mapping, Sequence, Set
 
-from .exceptions import UnsetRequiredSubstitution, InvalidSubstitution
+from .exceptions import UnsetRequiredSubstitution, InvalidSubstitution, CircularReferenceError
 
 # Brace formatted syntax separators (c.f. https://docs.docker.com/compose/compose-file/#variable-substitution)
 SEPARATOR_DEFAULT_IF_EMPTY = ':-'
@@ -19,6 +23,12 @@ SEPARATOR_DEFAULT_IF_UNSET = '-'
 SEPARATOR_ERROR_IF_EMPTY = ':?'
 SEPARATOR_ERROR_IF_UNSET = '?'
 
+# Maximum number of compiled template plans kept in memory
+TEMPLATE_CACHE_SIZE = 8192
+
+# Nesting depth beyond which objects are interpolated with an explicit stack instead of recursive calls
+RECURSION_DEPTH_LIMIT = 64
+
 
 class SubstitutionTemplate(string.Template):
     """Class used to substitute environment variables in a string
@@ -98,31 +108,194 @@ class SubstitutionTemplate(string.Template):
         'bid': r'[_a-z][_a-z0-9]*(?:(?P<sep>:?[-?])[^}]*)?',
     }
 
+    def compile(self):
+        """Compile `template` into a :class:`TemplatePlan`
+
+        Placeholders are parsed once so the plan can be substituted many times without scanning
+        the template again.
+        """
+        segments = []
+        literal = []
+        position = 0
+        for mo in self.pattern.finditer(self.template):
+            literal.append(self.template[position:mo.start()])
+            position = mo.end()
+
+            if mo.group('escaped') is not None:
+                literal.append(self.delimiter)
+                continue
+
+            if ''.join(literal):
+                segments.append(''.join(literal))
+            literal = []
+
+            named, braced = mo.group('named'), mo.group('braced')
+            if braced is not None:
+                sep = mo.group('sep')
+                if sep:
+                    var, _, arg = braced.partition(sep)
+                    segments.append(Placeholder(var, sep, arg))
+                else:
+                    segments.append(Placeholder(braced, None, None))
+            elif named is not None:
+                segments.append(Placeholder(named, None, None))
+            else:
+                segments.append(Placeholder(None, None, None))
+
+        literal.append(self.template[position:])
+        if ''.join(literal):
+            segments.append(''.join(literal))
+
+        return TemplatePlan(self.template, segments)
+
     def substitute(self, mapping):
         """Substitute values indexed by mapping into `template`
 
         :param mapping: Mapping containing values to substitute
         :type mapping: dict
         """
+        return compile_template(self.template, self.__class__).substitute(mapping)
 
-        def convert(mo):
-            named, braced = mo.group('named') or mo.group('braced'), mo.group('braced')
-            if braced is not None:
-                sep = mo.group('sep')
-                if sep:
-                    return process_braced_group(braced, sep, mapping)
 
-            if named is not None:
-                val = mapping[named]
-                return '%s' % (val,)
+class Placeholder(namedtuple('Placeholder', ['name', 'sep', 'arg'])):
+    """Placeholder of a compiled template
+
+    `sep` and `arg` are ``None`` for plain placeholders (``$VARIABLE`` or ``${VARIABLE}``) and
+    `name` is ``None`` for invalid placeholders.
+    """
 
-            if mo.group('escaped') is not None:  # pragma: no branch
-                return self.delimiter
+    __slots__ = ()
 
-            if mo.group('invalid') is not None:  # pragma: no branch
-                raise ValueError('Invalid placeholder: {}'.format(self.template))
+    def resolve(self, mapping, template):
+        """Return the value of the placeholder
 
-        return self.pattern.sub(convert, self.template)
+        :param mapping: Mapping with values to substitute
+        :type mapping: dict
+        :param template: Template the placeholder has been compiled from (used in error messages)
+        :type template: str
+        """
+        if self.sep is not None:
+            return resolve_separator(self.name, self.sep, self.arg, mapping)
+
+        if self.name is not None:
+            return '%s' % (mapping[self.name],)
+
+        raise ValueError('Invalid placeholder: {}'.format(template))
+
+
+class TemplatePlan:
+    """Compiled template made of literal segments and :class:`Placeholder` segments
+
+    :param template: Template the plan has been compiled from
+    :type template: str
+    :param segments: Sequence of literal strings and placeholders
+    :type segments: list
+    """
+
+    __slots__ = ('template', 'segments', 'variables')
+
+    def __init__(self, template, segments):
+        self.template = template
+        self.segments = tuple(segments)
+        self.variables = frozenset(segment.name for segment in self.segments
+                                   if isinstance(segment, Placeholder) and segment.name is not None)
+
+    @property
+    def is_static(self):
+        """Whether the template contains no placeholder"""
+        return all(isinstance(segment, str) for segment in self.segments)
+
+    def substitute(self, mapping, stats=None):
+        """Substitute values indexed by mapping into the compiled template
+
+        :param mapping: Mapping containing values to substitute
+        :type mapping: dict
+        :param stats: Optional statistics recording every placeholder substituted
+        :type stats: :class:`SubstitutionStats`
+        """
+        if len(self.segments) == 1 and isinstance(self.segments[0], str):
+            return self.segments[0]
+
+        if stats is not None:
+            for segment in self.segments:
+                if isinstance(segment, Placeholder):
+                    stats.record(segment, mapping)
+
+        return ''.join([segment if isinstance(segment, str) else segment.resolve(mapping, self.template)
+                        for segment in self.segments])
+
+
+class SubstitutionStats:
+    """Statistics of the placeholders substituted by an :class:`Interpolator`
+
+    :param mapping: Substitution mapping, used to report variables that were never referenced
+    :type mapping: dict
+
+    Example
+
+    >>> mapping = {'VARIABLE': 'value', 'EMPTY': '', 'UNUSED': 'value'}
+    >>> stats = SubstitutionStats(mapping)
+    >>> result = Interpolator(mapping).interpolate_recursive(['${VARIABLE}', '$VARIABLE', '${EMPTY:-a}', '${UNSET-b}'],
+    ...                                                      stats)
+    >>> stats.used == {'VARIABLE': 2, 'EMPTY': 1, 'UNSET': 1}
+    True
+    >>> sorted(stats.defaulted)
+    ['EMPTY', 'UNSET']
+    >>> stats.missing
+    {'UNSET'}
+    >>> stats.unused
+    {'UNUSED'}
+    """
+
+    __slots__ = ('mapping', 'used', 'defaulted', 'missing')
+
+    def __init__(self, mapping=None):
+        self.mapping = mapping or {}
+        self.used = Counter()
+        self.defaulted = set()
+        self.missing = set()
+
+    @property
+    def total(self):
+        """Number of placeholders substituted"""
+        return sum(self.used.values())
+
+    @property
+    def unused(self):
+        """Variables of the mapping that were never referenced"""
+        return set(self.mapping) - set(self.used)
+
+    def record(self, placeholder, mapping):
+        """Record the substitution of a placeholder
+
+        :param placeholder: Placeholder being substituted
+        :type placeholder: :class:`Placeholder`
+        :param mapping: Mapping containing values to substitute
+        :type mapping: dict
+        """
+        name = placeholder.name
+        if name is None:
+            return
+
+        self.used[name] += 1
+        if name not in mapping:
+            self.missing.add(name)
+            if placeholder.sep in (SEPARATOR_DEFAULT_IF_EMPTY, SEPARATOR_DEFAULT_IF_UNSET):
+                self.defaulted.add(name)
+        elif placeholder.sep == SEPARATOR_DEFAULT_IF_EMPTY and not mapping[name]:
+            self.defaulted.add(name)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(template, substitution_template=SubstitutionTemplate):
+    """Compile a template string into a cached :class:`TemplatePlan`
+
+    :param template: Template string to compile
+    :type template: str
+    :param substitution_template: Template class used to parse the template
+    :type substitution_template: type
+    """
+    return substitution_template(template).compile()
 
 
 def process_braced_group(braced, sep, mapping):
@@ -138,27 +311,249 @@ def process_braced_group(braced, sep, mapping):
     :param mapping: Mapping with values to substitute
     :type mapping: dict
     """
+    var, _, arg = braced.partition(sep)
+    return resolve_separator(var, sep, arg, mapping)
+
+
+def resolve_separator(var, sep, arg, mapping):
+    """Return substituted value of a braced placeholder already split on its separator or raise error
+
+    :param var: Name of the variable to substitute
+    :type var: str
+    :param sep: Separator in the braced syntax
+    :type sep: str
+    :param arg: Default value or error message following the separator
+    :type arg: str
+    :param mapping: Mapping with values to substitute
+    :type mapping: dict
+    """
 
     if sep == SEPARATOR_DEFAULT_IF_EMPTY:
-        var, _, default = braced.partition(SEPARATOR_DEFAULT_IF_EMPTY)
-        return mapping.get(var) or default
+        return mapping.get(var) or arg
 
     elif sep == SEPARATOR_DEFAULT_IF_UNSET:
-        var, _, default = braced.partition(SEPARATOR_DEFAULT_IF_UNSET)
-        return mapping.get(var, default)
+        return mapping.get(var, arg)
 
     elif sep == SEPARATOR_ERROR_IF_EMPTY:
-        var, _, err = braced.partition(SEPARATOR_ERROR_IF_EMPTY)
         rv = mapping.get(var)
         if not rv:
-            raise UnsetRequiredSubstitution(err)
+            raise UnsetRequiredSubstitution(arg)
         return rv
 
     elif sep == SEPARATOR_ERROR_IF_UNSET:  # pragma: no branch
-        var, _, err = braced.partition(SEPARATOR_ERROR_IF_UNSET)
         if var in mapping:
             return mapping.get(var)
-        raise UnsetRequiredSubstitution(err)
+        raise UnsetRequiredSubstitution(arg)
+
+
+class InterpolationTree:
+    """Document compiled into an index of the paths holding placeholders
+
+    Rendering only rebuilds containers on the way to those paths, every other subtree is shared
+    with the original document.
+
+    :param document: Document the tree has been compiled from
+    :type document: object
+    :param plans: Mapping from paths (tuples of keys and positions of elements) to :class:`TemplatePlan`
+    :type plans: dict
+
+    Example
+
+    >>> tree = Interpolator().compile_recursive({'key1': '${VARIABLE}', 'key2': {'static': 'value'}})
+    >>> list(tree.plans)
+    [('key1',)]
+    >>> result = tree.render({'VARIABLE': 'value'})
+    >>> result == {'key1': 'value', 'key2': {'static': 'value'}}
+    True
+    >>> result['key2'] is tree.document['key2']
+    True
+    """
+
+    def __init__(self, document, plans):
+        self.document = document
+        self.plans = plans
+        self.dependencies = {}
+        for path, plan in plans.items():
+            for var in plan.variables:
+                self.dependencies.setdefault(var, []).append(path)
+
+        self._trie = {}
+        for path, plan in plans.items():
+            node = self._trie
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            if path:
+                node[path[-1]] = plan
+            else:
+                self._trie = plan
+
+    def __len__(self):
+        return len(self.plans)
+
+    def render(self, mapping):
+        """Substitute values indexed by mapping into the document
+
+        :param mapping: Mapping containing values to substitute
+        :type mapping: dict
+        """
+        try:
+            return self._render(self.document, self._trie, mapping)
+        except ValueError as e:
+            raise InvalidSubstitution(e)
+
+    def paths_for(self, variables):
+        """Return the set of paths referencing at least one of the variables
+
+        :param variables: Names of variables
+        :type variables: iterable
+        """
+        return {path for var in variables for path in self.dependencies.get(var, ())}
+
+    def rerender(self, rendered, mapping, paths):
+        """Substitute values into a subset of paths of a previously rendered document
+
+        Containers are copied on the way to the re-rendered paths only.
+
+        :param rendered: Document previously returned by :meth:`render`
+        :type rendered: object
+        :param mapping: Mapping containing values to substitute
+        :type mapping: dict
+        :param paths: Paths to re-render
+        :type paths: iterable
+        """
+        trie = {}
+        for path in paths:
+            if not path:
+                return self.render(mapping)
+            node = trie
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = self.plans[path]
+
+        try:
+            return self._render(rendered, trie, mapping)
+        except ValueError as e:
+            raise InvalidSubstitution(e)
+
+    def _render(self, obj, trie, mapping):
+        if isinstance(trie, TemplatePlan):
+            return trie.substitute(mapping)
+
+        if not trie:
+            return obj
+
+        # Walk the trie depth first with an explicit stack so the document depth is not limited
+        stack = [_render_frame(obj, trie, None)]
+        while True:
+            target, frame, positions, items, parent_key = stack[-1]
+            for key, sub_trie in items:
+                index = key if positions is None else positions[key]
+                if isinstance(sub_trie, TemplatePlan):
+                    target[index] = sub_trie.substitute(mapping)
+                else:
+                    stack.append(_render_frame(target[index], sub_trie, key))
+                    break
+            else:
+                stack.pop()
+                result = target if frame is None else frame.build()
+                if not stack:
+                    return result
+                parent_target, _, parent_positions, _, _ = stack[-1]
+                parent_target[parent_key if parent_positions is None else parent_positions[parent_key]] = result
+
+
+# Types of values that are never containers nor templates
+_SCALAR_TYPES = frozenset([int, float, bool, type(None)])
+
+
+def _children(obj):
+    """Return an iterator over the (key, value) pairs of a container or ``None`` if obj is not one
+
+    Keys of sequences and sets are the positions of their elements.
+    """
+    if type(obj) is dict:
+        return iter(obj.items())
+
+    if type(obj) is list:
+        return enumerate(obj)
+
+    if isinstance(obj, Mapping):
+        return iter(obj.items())
+
+    if isinstance(obj, Set) or (isinstance(obj, Sequence) and not isinstance(obj, (str, bytes, bytearray))):
+        return enumerate(obj)
+
+    return None
+
+
+def _render_frame(obj, trie, parent_key):
+    """Return the stack entry rendering trie into a copy of container obj"""
+    items = iter(trie.items())
+    if type(obj) is dict or type(obj) is list:
+        return obj.copy(), None, None, items, parent_key
+
+    frame = _Frame(obj)
+    frame.results = list(frame.values)
+    if frame.keys is None:
+        positions = range(len(frame.values))
+    else:
+        positions = {key: index for index, key in enumerate(frame.keys)}
+    return frame.results, frame, positions, items, parent_key
+
+
+# Markers of interpolate_recursive memo
+_MISSING = object()
+_IN_PROGRESS = object()
+
+
+def _lookup(memo, obj):
+    """Return the memoized interpolation of obj or _MISSING"""
+    entry = memo.get(id(obj))
+    if entry is None or entry[0] is not obj:
+        return _MISSING
+
+    if entry[1] is _IN_PROGRESS:
+        raise CircularReferenceError('Circular reference to {} object'.format(type(obj).__name__))
+    return entry[1]
+
+
+class _Frame:
+    """Container being interpolated by :meth:`Interpolator.interpolate_recursive` or rendered by
+    :meth:`InterpolationTree.render`"""
+
+    __slots__ = ('obj', 'keys', 'values', 'results')
+
+    def __init__(self, obj):
+        self.obj = obj
+        if isinstance(obj, dict):
+            self.keys, self.values = list(obj), list(obj.values())
+        elif isinstance(obj, Mapping):
+            self.keys = list(obj)
+            self.values = [obj[key] for key in self.keys]
+        else:
+            self.keys, self.values = None, list(obj)
+        self.results = []
+
+    def build(self):
+        """Return the interpolated container, the original one if no value changed"""
+        if not any(map(operator.is_not, self.results, self.values)):
+            return self.obj
+
+        obj = self.obj
+        if self.keys is not None:
+            if isinstance(obj, dict):
+                # Copy preserves dict subclasses such as OrderedDict or defaultdict
+                result = obj.copy()
+                result.update(zip(self.keys, self.results))
+                return result
+            return type(obj)(dict(zip(self.keys, self.results)))
+
+        if type(obj) is list:
+            return self.results
+        elif isinstance(obj, tuple) and hasattr(obj, '_fields'):
+            # Named tuple
+            return type(obj)(*self.results)
+        return type(obj)(self.results)
 
 
 class Interpolator:
@@ -183,23 +578,245 @@ class Interpolator:
         self._substitution_template = substitution_template
         self._substitution_mapping = substitution_mapping or {}
 
-    def interpolate(self, string):
-        """Substitute environment variable in a string"""
+    def compile(self, string):
+        """Return the compiled plan of a string or ``None`` if the template class can not be compiled"""
+        if not hasattr(self._substitution_template, 'compile'):
+            return None
+        return compile_template(string, self._substitution_template)
+
+    def interpolate(self, string, stats=None):
+        """Substitute environment variable in a string
+
+        :param string: String to interpolate
+        :type string: str
+        :param stats: Optional statistics recording every placeholder substituted
+        :type stats: :class:`SubstitutionStats`
+        """
+        if self._substitution_template.delimiter not in string:
+            return string
+
         try:
-            return self._substitution_template(string).substitute(self._substitution_mapping)
+            plan = self.compile(string)
+            if plan is None:
+                return self._substitution_template(string).substitute(self._substitution_mapping)
+            return plan.substitute(self._substitution_mapping, stats)
         except ValueError as e:
             raise InvalidSubstitution(e)
 
-    def interpolate_recursive(self, obj):
-        """Substitute environment variable in an object"""
+    def interpolate_strings(self, strings, stats=None):
+        """Substitute environment variable in a list of strings
 
-        if isinstance(obj, str):
-            return self.interpolate(obj)
+        Lists without any delimiter are detected with a single scan, otherwise only strings holding
+        a delimiter are interpolated. The list itself is returned if no string changed.
 
-        elif isinstance(obj, dict):
-            return {key: self.interpolate_recursive(value) for key, value in obj.items()}
+        :param strings: Strings to interpolate
+        :type strings: list
+        :param stats: Optional statistics recording every placeholder substituted
+        :type stats: :class:`SubstitutionStats`
+        :returns: Interpolated strings
+        :type return: list
 
-        elif isinstance(obj, list):
-            return [self.interpolate_recursive(element) for element in obj]
+        >>> Interpolator({'HOST': 'localhost'}).interpolate_strings(['${HOST}:80', '127.0.0.1:80'])
+        ['localhost:80', '127.0.0.1:80']
+        """
+        delimiter = self._substitution_template.delimiter
+        # Raises TypeError if an element is not a string
+        if delimiter not in '\0'.join(strings):
+            return strings
+
+        interpolate = self.interpolate
+        result = [interpolate(string, stats) if delimiter in string else string for string in strings]
+        if any(map(operator.is_not, result, strings)):
+            return result
+        return strings
+
+    def compile_recursive(self, obj):
+        """Compile an object into an :class:`InterpolationTree`
+
+        Mappings, sequences and sets are walked with an explicit stack so the nesting depth is not
+        limited by the interpreter recursion limit. Containers referenced many times are compiled at
+        every path they are referenced from.
+
+        :param obj: Object to compile
+        :type obj: object
+        :raises CircularReferenceError: If obj contains itself
+        """
+        if not hasattr(self._substitution_template, 'compile'):
+            raise TypeError('{} does not support compilation'.format(self._substitution_template.__name__))
+
+        plans = {}
+        children = _children(obj)
+        if children is None:
+            self._compile_value(obj, (), plans)
+            return InterpolationTree(obj, plans)
+
+        # Walk the document depth first with an explicit stack so its depth is not limited, containers
+        # on the stack are tracked by identifier to detect cycles
+        delimiter = self._substitution_template.delimiter
+        stack = [(obj, (), children)]
+        walking = {id(obj)}
+        while stack:
+            container, path, children = stack[-1]
+            for key, value in children:
+                value_type = type(value)
+                if value_type is str:
+                    if delimiter in value:
+                        self._compile_value(value, path + (key,), plans)
+                    continue
+                elif value_type in _SCALAR_TYPES:
+                    continue
+
+                value_children = _children(value)
+                if value_children is None:
+                    self._compile_value(value, path + (key,), plans)
+                    continue
+
+                if id(value) in walking:
+                    raise CircularReferenceError('Circular reference to {} object'.format(type(value).__name__))
+                walking.add(id(value))
+                stack.append((value, path + (key,), value_children))
+                break
+            else:
+                stack.pop()
+                walking.discard(id(container))
+
+        return InterpolationTree(obj, plans)
+
+    def _compile_value(self, obj, path, plans):
+        if isinstance(obj, str) and self._substitution_template.delimiter in obj:
+            plan = self.compile(obj)
+            if plan.segments != (obj,):
+                plans[path] = plan
+
+    def interpolate_recursive(self, obj, stats=None):
+        """Substitute environment variable in an object
+
+        Mappings, sequences (lists, tuples...) and sets are walked recursively up to
+        :data:`RECURSION_DEPTH_LIMIT` nesting levels and with an explicit stack beyond, so the nesting
+        depth is not limited by the interpreter recursion limit.
+
+        Containers are copied on write: a container is only copied if one of its descendants
+        changed, otherwise the original object is returned. The result may thus share objects
+        with obj.
+
+        Containers referenced many times (e.g. through YAML aliases) are interpolated once and
+        their interpolation is shared at every reference, statistics thus record their
+        placeholders once.
+
+        :param obj: Object to interpolate
+        :type obj: object
+        :param stats: Optional statistics recording every placeholder substituted
+        :type stats: :class:`SubstitutionStats`
+        :raises CircularReferenceError: If obj contains itself
+        """
+        return self._interpolate_recursive(obj, stats, {}, 0)
 
-        return obj
+    def _interpolate_recursive(self, obj, stats, memo, depth):
+        # memo maps identifiers of containers to the container and its interpolation (_IN_PROGRESS while
+        # it is being interpolated) so shared subtrees are interpolated once and cycles are detected
+        if isinstance(obj, str):
+            return self.interpolate(obj, stats)
+
+        result = _lookup(memo, obj)
+        if result is not _MISSING:
+            return result
+
+        if type(obj) is not dict:
+            is_leaf, result = self._interpolate_value(obj, stats)
+            if is_leaf:
+                if type(obj) is list:
+                    memo[id(obj)] = (obj, result)
+                return result
+
+        if depth >= RECURSION_DEPTH_LIMIT:
+            return self._interpolate_iterative(obj, stats, memo)
+
+        memo[id(obj)] = (obj, _IN_PROGRESS)
+        if type(obj) is dict:
+            result = self._interpolate_dict(obj, stats, memo, depth)
+        else:
+            frame = _Frame(obj)
+            frame.results = [self._interpolate_recursive(value, stats, memo, depth + 1) for value in frame.values]
+            result = frame.build()
+        memo[id(obj)] = (obj, result)
+
+        return result
+
+    def _interpolate_dict(self, obj, stats, memo, depth):
+        delimiter = self._substitution_template.delimiter
+        result = None
+        for key, value in obj.items():
+            if isinstance(value, str):
+                if delimiter not in value:
+                    continue
+                interpolated = self.interpolate(value, stats)
+            else:
+                interpolated = self._interpolate_recursive(value, stats, memo, depth + 1)
+
+            if interpolated is not value:
+                if result is None:
+                    result = obj.copy()
+                result[key] = interpolated
+
+        return obj if result is None else result
+
+    def _interpolate_iterative(self, obj, stats, memo):
+        interpolate = self.interpolate
+        delimiter = self._substitution_template.delimiter
+
+        stack = [_Frame(obj)]
+        memo[id(obj)] = (obj, _IN_PROGRESS)
+        while True:
+            frame = stack[-1]
+            values, results = frame.values, frame.results
+
+            # Interpolate values up to the next container to walk
+            child = None
+            for index in range(len(results), len(values)):
+                value = values[index]
+                if isinstance(value, str):
+                    results.append(interpolate(value, stats) if delimiter in value else value)
+                    continue
+
+                result = _lookup(memo, value)
+                if result is _MISSING:
+                    is_leaf, result = self._interpolate_value(value, stats)
+                    if not is_leaf:
+                        child = value
+                        break
+                    if type(value) is list:
+                        memo[id(value)] = (value, result)
+                results.append(result)
+
+            if child is not None:
+                memo[id(child)] = (child, _IN_PROGRESS)
+                stack.append(_Frame(child))
+                continue
+
+            stack.pop()
+            result = frame.build()
+            memo[id(frame.obj)] = (frame.obj, result)
+            if not stack:
+                return result
+            stack[-1].results.append(result)
+
+    def _interpolate_value(self, value, stats):
+        """Return whether value is a leaf and its interpolation, containers to walk are returned as is"""
+        if type(value) is dict:
+            return False, value
+
+        if isinstance(value, str):
+            return True, self.interpolate(value, stats)
+
+        if type(value) is list:
+            try:
+                return True, self.interpolate_strings(value, stats)
+            except TypeError:
+                # List does not only contain strings
+                return False, value
+
+        if isinstance(value, (Mapping, Set)) or \
+                (isinstance(value, Sequence) and not isinstance(value, (bytes, bytearray))):
+            return False, value
+
+        return True, value
@@ -0,0 +1,179 @@
+"""
+    cfg_loader.lazy
+    ~~~~~~~~~~~~~~~
+
+    Implement lazily validated configuration
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import threading
+from collections.abc import Mapping
+
+from marshmallow import missing
+
+from .fields import UnwrapNested
+from .frozen import FrozenConfig, freeze
+
+
+class LazyConfig(Mapping):
+    """Configuration whose top-level fields are interpolated and validated on first access
+
+    Results are cached so each field is processed at most once. Iterating over the configuration
+    or calling :meth:`validate_all` loads the whole configuration at once. Membership tests are answered
+    from declared fields and input data keys without loading. Note that schema level validators only
+    receive the fields being loaded.
+
+    :param schema: Schema instance used to interpolate and deserialize input data
+    :type schema: :class:`~cfg_loader.schema.ConfigSchema`
+    :param data: Raw input data
+    :type data: dict
+    :param frozen: Whether to freeze loaded fields (c.f. :func:`~cfg_loader.frozen.freeze`)
+    :type frozen: bool
+
+    Example
+
+    >>> from cfg_loader import ConfigSchema
+    >>> from marshmallow import fields
+
+    >>> class MyConfigSchema(ConfigSchema):
+    ...     setting1 = fields.Str()
+    ...     setting2 = fields.Int(required=True)
+
+    >>> config = LazyConfig(MyConfigSchema(), {'setting1': 'value', 'setting2': 'invalid'})
+    >>> config['setting1']
+    'value'
+    >>> 'setting2' in config
+    True
+    >>> config['setting2']
+    Traceback (most recent call last):
+    ...
+    cfg_loader.exceptions.ValidationError: {'setting2': ['Not a valid integer.']}
+    """
+
+    def __init__(self, schema, data, frozen=False):
+        self.schema = schema
+        self.data = data
+        self.frozen = frozen
+        self._resolved = {}
+        self._loaded_fields = set()
+        self._fully_loaded = False
+        self._lock = threading.RLock()
+
+        # Index declared fields by output key
+        self._fields_by_key = {}
+        self._unwrap_fields = []
+        for name, field in schema.fields.items():
+            if field.dump_only:
+                continue
+            if isinstance(field, UnwrapNested):
+                self._unwrap_fields.append(name)
+            else:
+                self._fields_by_key[(field.attribute or name).split('.')[0]] = name
+
+    def __getitem__(self, key):
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if not self._fully_loaded:
+                if key in self._fields_by_key:
+                    self._load_fields([self._fields_by_key[key]])
+                elif key in self.data and key not in self.schema.fields:
+                    self._load_extra_field(key)
+                else:
+                    self._load_fields(self._unwrap_fields)
+
+        return self._resolved[key]
+
+    def __contains__(self, key):
+        if key in self._resolved:
+            return True
+
+        if self._fully_loaded:
+            return False
+
+        if key in self._fields_by_key:
+            name = self._fields_by_key[key]
+            return name not in self._loaded_fields and _is_provided(self.schema.fields[name], name, self.data)
+
+        if key in self.data and key not in self.schema.fields:
+            return True
+
+        return any(self._unwrapped_contains(name, key) for name in self._unwrap_fields
+                   if name not in self._loaded_fields)
+
+    def __iter__(self):
+        return iter(self.validate_all())
+
+    def __len__(self):
+        return len(self.validate_all())
+
+    def __repr__(self):
+        return '<{} loaded={!r}>'.format(self.__class__.__name__, sorted(self._resolved, key=str))
+
+    @property
+    def loaded_fields(self):
+        """Names of the fields loaded so far"""
+        return frozenset(self._loaded_fields)
+
+    def validate_all(self):
+        """Interpolate and validate the whole configuration and return it as a dictionary
+        (a :class:`~cfg_loader.frozen.FrozenConfig` if fields are frozen)"""
+        with self._lock:
+            if not self._fully_loaded:
+                self._resolved = self._freeze(self.schema.load(self.data))
+                self._loaded_fields.update(self.schema.fields)
+                self._fully_loaded = True
+
+            if self.frozen:
+                return FrozenConfig(self._resolved)
+            return self._resolved
+
+    def _load_fields(self, names):
+        names = [name for name in names if name not in self._loaded_fields]
+        if not names:
+            return
+
+        subset = {}
+        for name in names:
+            input_key = self.schema.fields[name].data_key or name
+            if input_key in self.data:
+                subset[input_key] = self.data[input_key]
+
+        other_fields = tuple(name for name in self.schema.fields if name not in names)
+        self._resolved.update(self._freeze(self.schema.load(subset, partial=other_fields)))
+        self._loaded_fields.update(names)
+
+    def _unwrapped_contains(self, name, key):
+        field = self.schema.fields[name]
+        value = self.data.get(field.data_key or name)
+        if not isinstance(value, Mapping) or not isinstance(key, str) or not key.startswith(field.prefix):
+            return False
+
+        key = key[len(field.prefix):]
+        for nested_name, nested_field in field.schema.fields.items():
+            if not nested_field.dump_only and (nested_field.attribute or nested_name) == key:
+                return _is_provided(nested_field, nested_name, value)
+
+        return key in value
+
+    def _load_extra_field(self, key):
+        value = self.data[key]
+        if self.schema.substitution_mapping:
+            value = self.schema.interpolator.interpolate_recursive(value)
+        self._resolved[key] = freeze(value) if self.frozen else value
+
+    def _freeze(self, result):
+        if not self.frozen:
+            return result
+        memo = {}
+        return {key: freeze(value, memo) for key, value in result.items()}
+
+
+def _is_provided(field, name, data):
+    """Whether loading data is expected to output field, i.e. it is in data or has a default value"""
+    return (field.data_key or name) in data or field.missing is not missing
@@ -8,24 +8,123 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
+import asyncio
+import concurrent.futures
+import functools
+import glob
 import os
+from collections import OrderedDict
 
-from .exceptions import ConfigFileMissingError, ConfigFileNotFoundError
-from .utils import parse_yaml_file
+from .cache import LRUCache
+from .exceptions import ConfigLoaderError, ConfigFileMissingError, ConfigFileNotFoundError
+from .frozen import freeze
+from .instrumentation import STAGE_CHECK_FILE, STAGE_INTERPOLATE, STAGE_LOAD, STAGE_PARSE, stage
+from .lazy import LazyConfig
+from .parsers import get_parser, get_parser_name, parse_file
+from .utils import parse_yaml, parse_yaml_documents, get_yaml_backend, mapping_fingerprint, deep_merge, \
+    file_fingerprint
 
 # Default environment variable containing the path of a .yaml configuration file
 DEFAULT_CONFIG_FILE_ENV_VAR = 'CONFIG_FILE'
 
+# Default number of prepared schema instances kept by a loader
+DEFAULT_SCHEMA_CACHE_SIZE = 16
+
+
+class LoadState:
+    """State of the last configuration load, used to apply substitution changes incrementally
+
+    :param data: Raw input data
+    :type data: object
+    :param substitution_mapping: Mapping used to interpolate input data
+    :type substitution_mapping: dict
+    :param config: Loaded configuration
+    :type config: dict
+    """
+
+    __slots__ = ('data', 'substitution_mapping', 'config', 'tree', 'rendered')
+
+    def __init__(self, data, substitution_mapping, config):
+        self.data = data
+        self.substitution_mapping = substitution_mapping
+        self.config = config
+        self.tree = None
+        self.rendered = None
+
+
+class BatchResult:
+    """Result of loading many configuration files
+
+    :param configs: Loaded configurations by configuration file
+    :type configs: OrderedDict
+    :param errors: Exceptions raised while loading by configuration file
+    :type errors: OrderedDict
+    """
+
+    def __init__(self, configs=None, errors=None):
+        self.configs = configs or OrderedDict()
+        self.errors = errors or OrderedDict()
+
+    @property
+    def ok(self):
+        """Whether every configuration file has been loaded"""
+        return not self.errors
+
+
+def _load_config_file(loader, config_file, substitution_mapping):
+    return loader.load(config_file, substitution_mapping)
+
 
 class BaseConfigLoader:
     """Base config loader using a marshmallow schema to validate and process input data
 
     :param schema: Marshmallow schema used to deserialize configuration input data
+    :param schema_cache_size: Maximum number of schema instances kept for reuse across loads
+    :type schema_cache_size: int
+    :param frozen: Whether to return immutable :class:`~cfg_loader.frozen.FrozenConfig` configurations
+    :type frozen: bool
+    :param instrumentation: Optional instrumentation receiving timings and metrics of every loading stage
+    :type instrumentation: :class:`~cfg_loader.instrumentation.Instrumentation`
+    :param track_substitutions: Whether to keep input data of the last load so substitution changes can be
+        applied with :meth:`update_substitutions`
+    :type track_substitutions: bool
     """
 
-    def __init__(self, config_schema, substitution_mapping=None):
+    def __init__(self, config_schema, substitution_mapping=None, schema_cache_size=DEFAULT_SCHEMA_CACHE_SIZE,
+                 frozen=False, instrumentation=None, track_substitutions=False):
         self.substitution_mapping = substitution_mapping or {}
         self.config_schema = config_schema
+        self.frozen = frozen
+        self.instrumentation = instrumentation
+        self.track_substitutions = track_substitutions
+        self._schema_cache = LRUCache(maxsize=schema_cache_size)
+        self._last_load = None
+
+    def __getstate__(self):
+        # Last load is not transferred when a loader is sent to another process
+        state = self.__dict__.copy()
+        state['_last_load'] = None
+        return state
+
+    def get_schema(self, substitution_mapping):
+        """Return a schema instance interpolating with substitution_mapping
+
+        Instances are cached by mapping content so they are built once per distinct mapping.
+        Schemas of frozen loaders share the result of subtrees loaded many times (c.f.
+        :class:`~cfg_loader.schema.InterpolatingSchema`) since it can not be mutated.
+
+        :param substitution_mapping: Mapping with values to substitute
+        :type substitution_mapping: dict
+        """
+        key = mapping_fingerprint(substitution_mapping)
+        if key is None:
+            return self._create_schema(substitution_mapping)
+
+        return self._schema_cache.get_or_set(key, lambda: self._create_schema(dict(substitution_mapping)))
+
+    def _create_schema(self, substitution_mapping):
+        return self.config_schema(substitution_mapping=substitution_mapping, instrumentation=self.instrumentation,
+                                  share_subtrees=self.frozen)
 
     def load(self, data, substitution_mapping=None):
         """Load configuration from an object
@@ -33,29 +132,138 @@ class BaseConfigLoader:
         :param input: Data to load configuration from (must be deserializable by schema)
         :type input: object
         """
+        with stage(self.instrumentation, STAGE_LOAD):
+            return self._load_data(data, substitution_mapping)
+
+    def _load_data(self, data, substitution_mapping):
         substitution_mapping = substitution_mapping or self.substitution_mapping
 
-        return self.config_schema(substitution_mapping=substitution_mapping).load(data)
+        config = self.get_schema(substitution_mapping).load(data)
+        if self.frozen:
+            config = freeze(config)
+        if self.track_substitutions:
+            self._last_load = LoadState(data, substitution_mapping, config)
 
+        return config
 
-class YamlConfigLoader(BaseConfigLoader):
-    """Config loader that reads config from .yaml file
+    def load_lazy(self, data, substitution_mapping=None):
+        """Return a configuration whose fields are interpolated and validated on first access
+
+        Fields of loaders created with ``frozen=True`` are frozen once loaded.
+
+        :param data: Data to load configuration from (must be deserializable by schema)
+        :type data: object
+        :returns: Lazily loaded configuration
+        :type return: :class:`~cfg_loader.lazy.LazyConfig`
+        """
+        substitution_mapping = substitution_mapping or self.substitution_mapping
+
+        return LazyConfig(self.get_schema(substitution_mapping), data, frozen=self.frozen)
+
+    async def aload(self, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of :meth:`load`
+
+        Loading (including file I/O and parsing for file loaders) runs in an executor so the event
+        loop is not blocked. It accepts the same arguments as :meth:`load`.
+
+        :param executor: Executor to run loading in, defaults to the event loop default executor
+        :type executor: concurrent.futures.Executor
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, functools.partial(self.load, *args, **kwargs))
+
+    def update_substitutions(self, changes):
+        """Apply changes of the substitution mapping to the last loaded configuration
+
+        Only top-level fields referencing a changed variable are re-interpolated and re-validated,
+        other fields are shared with the previously loaded configuration. Note that schema level
+        validators only receive the re-validated fields. The loader must be created with
+        ``track_substitutions=True``.
+
+        :param changes: Mapping of changed variables (a ``None`` value unsets the variable)
+        :type changes: dict
+        :returns: Updated configuration
+        :type return: dict
+        """
+        if not self.track_substitutions:
+            raise ConfigLoaderError('Substitutions are not tracked, create the loader with track_substitutions=True')
+
+        state = self._last_load
+        if state is None:
+            raise ConfigLoaderError('No configuration has been loaded yet')
+
+        substitution_mapping = dict(state.substitution_mapping)
+        for var, value in changes.items():
+            if value is None:
+                substitution_mapping.pop(var, None)
+            else:
+                substitution_mapping[var] = value
+
+        unset = object()
+        changed = {var for var in changes
+                   if state.substitution_mapping.get(var, unset) != substitution_mapping.get(var, unset)}
+
+        # Interpolation is skipped for empty mappings so a full load is required
+        if not isinstance(state.data, dict) or not state.substitution_mapping or not substitution_mapping:
+            return self.load(state.data, substitution_mapping)
+
+        if state.tree is None:
+            interpolator = self.config_schema._interpolator_class(
+                substitution_template=self.config_schema._substitution_template
+            )
+            state.tree = interpolator.compile_recursive(state.data)
+            state.rendered = state.tree.render(state.substitution_mapping)
+
+        paths = state.tree.paths_for(changed)
+        if paths:
+            with stage(self.instrumentation, STAGE_INTERPOLATE):
+                rendered = state.tree.rerender(state.rendered, substitution_mapping, paths)
+            fields = {path[0] for path in paths}
+            result = self.get_schema({}).load({field: rendered[field] for field in fields}, partial=True)
+
+            config = dict(state.config)
+            config.update(result)
+            if self.frozen:
+                config = freeze(config)
+        else:
+            rendered, config = state.rendered, state.config
+
+        new_state = LoadState(state.data, substitution_mapping, config)
+        new_state.tree, new_state.rendered = state.tree, rendered
+        self._last_load = new_state
+
+        return config
+
+
+class FileConfigLoader(BaseConfigLoader):
+    """Config loader that reads config from a file parsed according to its extension
 
     :param config_file_env_var: Environment variable to read config file path from if not provided when loading
     :type config_file_env_var: str
     :param default_config_path: Used if neither path is provided at loading nor environment variable
     :type default_config_path: str
+    :param result_cache: Optional cache returning previously loaded configurations
+    :type result_cache: :class:`~cfg_loader.cache.ConfigCache`
+    :param parse_cache: Optional persistent cache of parsed configuration files
+    :type parse_cache: :class:`~cfg_loader.cache.ParseCache`
+    :param parser: Name of the parser to use (c.f. :mod:`cfg_loader.parsers`), defaults to the parser
+        registered for the file extension
+    :type parser: str
     """
 
-    def __init__(self, *args, config_file_env_var=DEFAULT_CONFIG_FILE_ENV_VAR, default_config_path=None, **kwargs):
+    def __init__(self, *args, config_file_env_var=DEFAULT_CONFIG_FILE_ENV_VAR, default_config_path=None,
+                 result_cache=None, parse_cache=None, parser=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.config_file_env_var = config_file_env_var
         self.default_config_path = default_config_path
+        self.result_cache = result_cache
+        self.parse_cache = parse_cache
+        self.parser = parser
 
     def check_file(self, config_file):
         """Check file validity
 
-        :param config_file: Path to the .yaml configuration file
+        :param config_file: Path to the configuration file
         :type config_file: str
         """
 
@@ -73,19 +281,296 @@ class YamlConfigLoader(BaseConfigLoader):
 
         return config_file
 
+    def get_config_file(self, config_file=None):
+        """Return the configuration file to load and check its validity
+
+        Falls back to the environment variable then to the default path if config_file is not provided.
+
+        :param config_file: Path to the configuration file
+        :type config_file: str
+        """
+        config_file = config_file or os.environ.get(self.config_file_env_var) or self.default_config_path
+
+        return self.check_file(config_file)
+
+    def get_parser(self, config_file):
+        """Return the name and the parser to use for a configuration file
+
+        :param config_file: Path to the configuration file
+        :type config_file: str
+        """
+        name = self.parser or get_parser_name(config_file)
+        return name, get_parser(name)
+
+    def parse_file(self, config_file):
+        """Parse a configuration file
+
+        :param config_file: Path to the configuration file
+        :type config_file: str
+        """
+        name, parser = self.get_parser(config_file)
+        with stage(self.instrumentation, STAGE_PARSE):
+            if self.instrumentation is not None:
+                self.instrumentation.on_bytes_read(config_file, os.path.getsize(config_file))
+
+            if self.parse_cache is not None:
+                return self.parse_cache.load(config_file, parser, namespace=name)
+
+            return parse_file(config_file, parser)
+
+    def cache_key(self):
+        """Return a hashable identifying what the loader produces from a file
+
+        Loaders sharing a :class:`~cfg_loader.cache.ConfigCache` only reuse each other's configurations
+        when their keys are equal.
+        """
+        return type(self), self.config_schema, self.frozen, self.track_substitutions, self.parser
+
     def load(self, config_file=None, substitution_mapping=None):
-        """Load configuration from .yaml file
+        """Load configuration from a file
+
+        :param config_file: Path to the configuration file
+        :type config_file: str
+        """
+        with stage(self.instrumentation, STAGE_LOAD):
+            return self._load(config_file, substitution_mapping)
+
+    def _load(self, config_file, substitution_mapping):
+        # Check config_file is valid
+        with stage(self.instrumentation, STAGE_CHECK_FILE):
+            config_file = self.get_config_file(config_file)
+
+        if self.result_cache is None:
+            return self._load_file(config_file, substitution_mapping)
+
+        # Key is computed before reading the file so a concurrent update is never cached under a stale key
+        key = self.result_cache.key_for(config_file, substitution_mapping or self.substitution_mapping,
+                                        loader_key=self.cache_key())
+        # Only loaders tracking substitutions cache the input data along with the configuration
+        cached = self.result_cache.get(key) if key is not None else None
+        if cached is not None:
+            if self.track_substitutions:
+                self._last_load = cached
+                return cached.config
+            return cached
+
+        config = self._load_file(config_file, substitution_mapping)
+        if key is not None:
+            self.result_cache.set(key, self._last_load if self.track_substitutions else config)
+
+        return config
+
+    def load_lazy(self, config_file=None, substitution_mapping=None):
+        """Parse a configuration file and return a configuration whose fields are interpolated and
+        validated on first access
+
+        :param config_file: Path to the configuration file
+        :type config_file: str
+        :returns: Lazily loaded configuration
+        :type return: :class:`~cfg_loader.lazy.LazyConfig`
+        """
+        with stage(self.instrumentation, STAGE_CHECK_FILE):
+            config_file = self.get_config_file(config_file)
+
+        return super().load_lazy(self.parse_file(config_file), substitution_mapping)
+
+    def load_many(self, config_files, substitution_mapping=None, max_workers=None, executor=None):
+        """Load many configuration files concurrently
+
+        Files are parsed and validated in a process pool so CPU bound work runs in parallel.
+        The loader and its schema must be picklable (i.e. defined at module level).
+
+        :param config_files: Paths to the configuration files or a glob pattern
+        :type config_files: list | str
+        :param max_workers: Maximum number of worker processes, defaults to the number of CPUs
+        :type max_workers: int
+        :param executor: Executor to use instead of a new process pool
+        :type executor: concurrent.futures.Executor
+        :returns: Configurations and errors by configuration file
+        :type return: :class:`BatchResult`
+        """
+        if isinstance(config_files, str):
+            config_files = sorted(glob.glob(config_files))
+
+        if executor is None:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                return self.load_many(config_files, substitution_mapping, executor=executor)
+
+        futures = OrderedDict(
+            (config_file, executor.submit(_load_config_file, self, config_file, substitution_mapping))
+            for config_file in config_files
+        )
+
+        result = BatchResult()
+        for config_file, future in futures.items():
+            try:
+                result.configs[config_file] = future.result()
+            except Exception as e:
+                result.errors[config_file] = e
+
+        return result
+
+    def _load_file(self, config_file, substitution_mapping):
+        data = self.parse_file(config_file)
+
+        return self._load_data(data, substitution_mapping)
+
+
+class YamlConfigLoader(FileConfigLoader):
+    """Config loader that reads config from .yaml file
+
+    It accepts the same arguments as :class:`FileConfigLoader`
+
+    :param yaml_backend: YAML backend (``'libyaml'`` or ``'python'``), defaults to the fastest available
+    :type yaml_backend: str
+    """
+
+    def __init__(self, *args, yaml_backend=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.yaml_backend = get_yaml_backend(yaml_backend)
+
+    def get_parser(self, config_file):
+        """Return the name and the parser to use for a configuration file
 
         :param config_file: Path to the .yaml configuration file
         :type config_file: str
         """
+        return 'yaml', functools.partial(parse_yaml, backend=self.yaml_backend)
 
-        config_file = config_file or os.environ.get(self.config_file_env_var) or self.default_config_path
+    def cache_key(self):
+        return super().cache_key() + (self.yaml_backend,)
 
-        # Check config_file is valid
-        self.check_file(config_file)
+    def load_all(self, config_file=None, substitution_mapping=None):
+        """Lazily load configurations from the documents of a multi-document .yaml file
+
+        Documents are parsed and validated one at a time as the returned iterator is consumed
+        so memory usage does not depend on the number of documents. Empty documents are skipped.
 
-        # Parse yaml file
-        data = parse_yaml_file(config_file)
+        :param config_file: Path to the .yaml configuration file
+        :type config_file: str
+        :returns: Iterator over loaded configurations
+        :type return: iterator
+        """
+        # Check config_file eagerly so errors are not delayed until iteration
+        with stage(self.instrumentation, STAGE_CHECK_FILE):
+            config_file = self.get_config_file(config_file)
+
+        return self._load_documents(config_file, substitution_mapping)
+
+    def _load_documents(self, config_file, substitution_mapping):
+        with open(config_file, 'rb') as f:
+            for data in parse_yaml_documents(f, self.yaml_backend):
+                if data is not None:
+                    yield BaseConfigLoader.load(self, data, substitution_mapping)
+
+
+class LayeredConfigLoader(BaseConfigLoader):
+    """Config loader that deep-merges layers of configuration before loading
+
+    Layers are configuration files (parsed according to their extension) or dictionaries,
+    later layers taking precedence. The merge of the static layers is cached and only computed
+    again when one of the layer files is modified; the dynamic layer provided at loading is
+    merged on top of it at every load. Dictionary layers must not be modified after the loader
+    creation and loaded configurations may share objects with the cached merge so they should
+    not be mutated.
+
+    :param layers: Ordered static layers (paths to configuration files or dictionaries)
+    :type layers: list
+    :param parse_cache: Optional persistent cache of parsed configuration files
+    :type parse_cache: :class:`~cfg_loader.cache.ParseCache`
+
+    Example
+
+    >>> from cfg_loader import ConfigSchema
+    >>> from marshmallow import fields
+
+    >>> class DatabaseSchema(ConfigSchema):
+    ...     host = fields.Str()
+    ...     port = fields.Int()
+
+    >>> class MyConfigSchema(ConfigSchema):
+    ...     db = fields.Nested(DatabaseSchema)
+
+    >>> loader = LayeredConfigLoader(MyConfigSchema, layers=[{'db': {'host': 'localhost', 'port': '5432'}}])
+    >>> config = loader.load({'db': {'host': '${DB_HOST}'}}, substitution_mapping={'DB_HOST': 'db.local'})
+    >>> config == {'db': {'host': 'db.local', 'port': 5432}}
+    True
+    """
+
+    def __init__(self, *args, layers=(), parse_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.layers = list(layers)
+        self.parse_cache = parse_cache
+        self._merged_layers = None
+
+    def parse_layer(self, layer):
+        """Return the data of a layer
+
+        :param layer: Path to a configuration file or dictionary
+        :type layer: str | dict
+        """
+        if not isinstance(layer, str):
+            return layer
+
+        with stage(self.instrumentation, STAGE_CHECK_FILE):
+            if not os.path.isfile(layer):
+                raise ConfigFileNotFoundError("""
+                        No such file '{path}'
+                    """.format(path=layer))
+
+        with stage(self.instrumentation, STAGE_PARSE):
+            if self.instrumentation is not None:
+                self.instrumentation.on_bytes_read(layer, os.path.getsize(layer))
+
+            if self.parse_cache is not None:
+                name = get_parser_name(layer)
+                return self.parse_cache.load(layer, get_parser(name), namespace=name)
+
+            return parse_file(layer)
+
+    def merge_layers(self):
+        """Return the merge of the static layers, merging them again only if a layer file changed"""
+        try:
+            key = tuple(file_fingerprint(layer) for layer in self.layers if isinstance(layer, str))
+        except FileNotFoundError:
+            key = None
+
+        merged_layers = self._merged_layers
+        if key is not None and merged_layers is not None and merged_layers[0] == key:
+            return merged_layers[1]
+
+        merged = {}
+        for layer in self.layers:
+            merged = deep_merge(merged, self.parse_layer(layer) or {})
+
+        self._merged_layers = (key, merged)
+        return merged
+
+    def invalidate(self):
+        """Discard the cached merge of the static layers"""
+        self._merged_layers = None
+
+    def load(self, layer=None, substitution_mapping=None):
+        """Load configuration from the static layers and an optional dynamic layer
+
+        :param layer: Dynamic layer merged on top of static layers (path to a configuration file or dictionary)
+        :type layer: str | dict
+        """
+        with stage(self.instrumentation, STAGE_LOAD):
+            return self._load_data(self._merge(layer), substitution_mapping)
+
+    def load_lazy(self, layer=None, substitution_mapping=None):
+        """Merge layers and return a configuration whose fields are interpolated and validated on first access
+
+        :param layer: Dynamic layer merged on top of static layers (path to a configuration file or dictionary)
+        :type layer: str | dict
+        :returns: Lazily loaded configuration
+        :type return: :class:`~cfg_loader.lazy.LazyConfig`
+        """
+        return super().load_lazy(self._merge(layer), substitution_mapping)
 
-        return super().load(data, substitution_mapping)
+    def _merge(self, layer):
+        data = self.merge_layers()
+        if layer is not None:
+            data = deep_merge(data, self.parse_layer(layer) or {})
+        return data
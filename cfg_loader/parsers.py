@@ -0,0 +1,122 @@
+"""
+    cfg_loader.parsers
+    ~~~~~~~~~~~~~~~~~~
+
+    Implement the registry of configuration file parsers
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import json
+import os
+
+from .exceptions import UnsupportedFormatError
+from .utils import parse_yaml, map_file
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import tomllib as toml
+except ImportError:  # pragma: no cover
+    try:
+        import toml
+    except ImportError:
+        toml = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# Parsers by name, a parser takes raw file content (bytes or memory-mapped file) and returns parsed data
+PARSERS = {}
+
+# Parser names by file extension
+EXTENSIONS = {}
+
+
+def register_parser(name, parser, extensions=()):
+    """Register a parser
+
+    :param name: Name of the parser
+    :type name: str
+    :param parser: Callable taking raw file content (bytes or memory-mapped file) and returning parsed data
+    :type parser: callable
+    :param extensions: File extensions (including the leading dot) the parser is used for
+    :type extensions: iterable
+    """
+    PARSERS[name] = parser
+    for extension in extensions:
+        EXTENSIONS[extension.lower()] = name
+
+
+def get_parser(name):
+    """Return the parser registered with name
+
+    :param name: Name of the parser
+    :type name: str
+    """
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise UnsupportedFormatError('No parser registered for format \'{}\''.format(name))
+
+
+def get_parser_name(path):
+    """Return the name of the parser to use for a file according to its extension
+
+    :param path: Path to the file
+    :type path: str
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        return EXTENSIONS[extension]
+    except KeyError:
+        raise UnsupportedFormatError(
+            'No parser registered for extension \'{}\' of file \'{}\''.format(extension, path)
+        )
+
+
+def parse_file(path, parser=None):
+    """Parse a file
+
+    :param path: Path to the file
+    :type path: str
+    :param parser: Parser to use, defaults to the parser registered for the file extension
+    :type parser: callable
+    """
+    parser = parser or get_parser(get_parser_name(path))
+    with map_file(path) as content:
+        return parser(content)
+
+
+def parse_json(content):
+    """Parse JSON content, using orjson if it is installed"""
+    if orjson is not None:
+        with memoryview(content) as view:
+            return orjson.loads(view)
+    return json.loads(str(content, 'utf-8'))
+
+
+def parse_toml(content):
+    """Parse TOML content"""
+    return toml.loads(str(content, 'utf-8'))
+
+
+def parse_msgpack(content):
+    """Parse msgpack content"""
+    return msgpack.unpackb(content, raw=False)
+
+
+register_parser('yaml', parse_yaml, extensions=['.yml', '.yaml'])
+register_parser('json', parse_json, extensions=['.json'])
+
+if toml is not None:  # pragma: no branch
+    register_parser('toml', parse_toml, extensions=['.toml'])
+
+if msgpack is not None:  # pragma: no branch
+    register_parser('msgpack', parse_msgpack, extensions=['.msgpack', '.mpk'])
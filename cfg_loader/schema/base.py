@@ -8,14 +8,20 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
+import threading
+
 import marshmallow
 from marshmallow import Schema, post_load
 
 from ..exceptions import ValidationError
 from ..fields import UnwrapNested
-from ..interpolator import SubstitutionTemplate, Interpolator
+from ..instrumentation import STAGE_INTERPOLATE, STAGE_VALIDATE, count_errors, stage
+from ..interpolator import SubstitutionTemplate, Interpolator, SubstitutionStats
 from ..utils import add_prefix
 
+# Memo of the loads of nested schemas during the current top-level load
+_load_memo = threading.local()
+
 
 class InterpolatingSchema(Schema):
     """Schema class that interpolate environ variables from input data
@@ -25,13 +31,21 @@ class InterpolatingSchema(Schema):
 
     :param substitution_mapping: Mapping containing values to substitute
     :type substitution: dict
+    :param instrumentation: Optional instrumentation receiving interpolation and validation events
+    :type instrumentation: :class:`~cfg_loader.instrumentation.Instrumentation`
+    :param share_subtrees: Whether nested schemas load input data shared at many places (e.g. through
+        YAML aliases) once per top-level load. The result is then the same object at every place so
+        mutating it at one place changes all of them (loaders created with ``frozen=True`` enable it).
+    :type share_subtrees: bool
     """
 
     _interpolator_class = Interpolator
     _substitution_template = SubstitutionTemplate
 
-    def __init__(self, *args, substitution_mapping=None, **kwargs):
+    def __init__(self, *args, substitution_mapping=None, instrumentation=None, share_subtrees=False, **kwargs):
         self.substitution_mapping = substitution_mapping or {}
+        self.instrumentation = instrumentation
+        self.share_subtrees = share_subtrees
         self.interpolator = self._interpolator_class(substitution_mapping=self.substitution_mapping,
                                                      substitution_template=self._substitution_template)
         super().__init__(*args, **kwargs)
@@ -48,14 +62,68 @@ class InterpolatingSchema(Schema):
         :returns: Deserialized data
         :type return: dict
         """
+        memo = getattr(_load_memo, 'memo', None)
+        if memo is None:
+            # Top-level load, a memo of False disables sharing in nested loads
+            _load_memo.memo = {} if self.share_subtrees else False
+            try:
+                return self._load(data, many, partial)
+            finally:
+                _load_memo.memo = None
+
+        if memo is False or not isinstance(data, (dict, list)):
+            return self._load(data, many, partial)
+
+        # Empty contexts are distinct objects in every nested schema but are all equivalent
+        context = self.context or None
+        key = self._memo_key(data, many, partial, context)
+        entry = memo.get(key)
+        if entry is not None and entry[0] is data and entry[1] is context:
+            return entry[2]
+
+        result = self._load(data, many, partial)
+        memo[key] = (data, context, result)
+
+        return result
+
+    def _memo_key(self, data, many, partial, context):
+        # Objects are keyed by identifier and kept in the entry so a reused identifier is detected
+        return (
+            self.__class__,
+            id(data),
+            many,
+            tuple(partial) if isinstance(partial, list) else partial,
+            frozenset(self.only) if self.only is not None else None,
+            frozenset(self.exclude),
+            frozenset(self.dump_only),
+            frozenset(self.load_only),
+            id(context),
+        )
+
+    def _load(self, data, many, partial):
+        instrumentation = self.instrumentation
         if self.substitution_mapping:
             # substitute environment variables
-            data = self.interpolator.interpolate_recursive(data)
-
-        try:
-            return super().load(data, many, partial)
-        except marshmallow.exceptions.ValidationError as e:
-            raise ValidationError(e.normalized_messages())
+            with stage(instrumentation, STAGE_INTERPOLATE):
+                if instrumentation is None:
+                    data = self.interpolator.interpolate_recursive(data)
+                else:
+                    stats = SubstitutionStats(self.substitution_mapping)
+                    data = self.interpolator.interpolate_recursive(data, stats)
+                    instrumentation.on_substitutions(stats)
+
+        with stage(instrumentation, STAGE_VALIDATE):
+            try:
+                return super().load(data, many, partial)
+            except marshmallow.exceptions.ValidationError as e:
+                error = ValidationError(e.normalized_messages())
+            except ValidationError as e:
+                # Raised by a nested configuration schema
+                error = e
+
+            if instrumentation is not None:
+                instrumentation.on_validation_errors(count_errors(error.args[0]))
+            raise error
 
 
 class ExtraFieldsSchema(Schema):
@@ -84,7 +152,7 @@ class UnwrapNestedSchema(Schema):
     def unwrap_nested_fields(self, data):
         unwrap_nested = {}
         for field, value in self.fields.items():
-            if isinstance(value, UnwrapNested):
+            if isinstance(value, UnwrapNested) and field in data:
                 unwrap_nested.update(add_prefix(data.pop(field), value.prefix))
         data.update(unwrap_nested)
 
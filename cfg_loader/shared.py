@@ -0,0 +1,200 @@
+"""
+    cfg_loader.shared
+    ~~~~~~~~~~~~~~~~~
+
+    Implement publication of configuration in shared memory for pre-fork worker pools
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import inspect
+import os
+import pickle
+import struct
+import time
+
+from .exceptions import ConfigLoaderError
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # pragma: no cover
+    resource_tracker = shared_memory = None
+
+# Default size in bytes of a shared memory segment
+DEFAULT_SEGMENT_SIZE = 1024 * 1024
+
+# Segment header: generation counter and payload length
+HEADER = struct.Struct('<QQ')
+GENERATION = struct.Struct('<Q')
+LENGTH = struct.Struct('<Q')
+
+# Maximum number of attempts to read a consistent payload while it is being published
+MAX_READ_ATTEMPTS = 1000
+
+# Bounds in seconds of the exponential back-off between two read attempts
+MIN_READ_DELAY = 0.00001
+MAX_READ_DELAY = 0.01
+
+
+# Whether segments are registered with the resource tracker of every process attaching to them
+_TRACKED_ON_ATTACH = os.name == 'posix' and shared_memory is not None and \
+    'track' not in inspect.signature(shared_memory.SharedMemory).parameters
+
+# Names of the segments published by this process, inherited by forked workers
+_published_segments = set()
+
+
+def _shared_memory(name=None, create=False, size=0):
+    if shared_memory is None:  # pragma: no cover
+        raise ConfigLoaderError('Shared memory publication requires Python 3.8 or later')
+
+    if not create and not _TRACKED_ON_ATTACH and os.name == 'posix':  # pragma: no cover
+        # Readers must not unlink the segment when they exit
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if create:
+        _published_segments.add(shm.name)
+    elif _TRACKED_ON_ATTACH and shm.name not in _published_segments:
+        # The resource tracker of a reader process would unlink the segment when the reader exits.
+        # Readers forked from the publisher share its tracker and must leave the registration in place.
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _unlink(shm):
+    if _TRACKED_ON_ATTACH:
+        # Readers sharing the resource tracker of the publisher (e.g. spawned workers) may have unregistered it
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+    _published_segments.discard(shm.name)
+
+
+class SharedConfigPublisher:
+    """Publish configurations into a shared memory segment
+
+    Configurations are pickled into the segment after a header holding a generation counter and the
+    payload length. The generation is odd while a publication is in progress and is incremented by two
+    by every publication so readers can detect both torn reads and reloads. The length is written before
+    the final generation so a reader never sees a new generation with a stale length.
+
+    :param name: Name of the segment, generated if not provided
+    :type name: str
+    :param size: Size in bytes of the segment, it bounds the size of a serialized configuration
+    :type size: int
+
+    Example
+
+    >>> with SharedConfigPublisher() as publisher:
+    ...     publisher.publish({'setting': 'value'})
+    ...     with SharedConfigReader(publisher.name) as reader:
+    ...         reader.get()
+    2
+    {'setting': 'value'}
+    """
+
+    def __init__(self, name=None, size=DEFAULT_SEGMENT_SIZE):
+        self._shm = _shared_memory(name=name, create=True, size=HEADER.size + size)
+        self.generation = 0
+        HEADER.pack_into(self._shm.buf, 0, self.generation, 0)
+
+    @property
+    def name(self):
+        """Name of the shared memory segment readers attach to"""
+        return self._shm.name
+
+    def publish(self, config):
+        """Publish a configuration and return its generation
+
+        :param config: Configuration to publish
+        :type config: object
+        """
+        payload = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+        if HEADER.size + len(payload) > self._shm.size:
+            raise ConfigLoaderError('Serialized configuration ({} bytes) does not fit in shared memory segment '
+                                    '({} bytes)'.format(len(payload), self._shm.size - HEADER.size))
+
+        buf = self._shm.buf
+        GENERATION.pack_into(buf, 0, self.generation + 1)
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        LENGTH.pack_into(buf, GENERATION.size, len(payload))
+        self.generation += 2
+        GENERATION.pack_into(buf, 0, self.generation)
+
+        return self.generation
+
+    def close(self):
+        """Close and destroy the segment"""
+        self._shm.close()
+        _unlink(self._shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SharedConfigReader:
+    """Read configurations published by a :class:`SharedConfigPublisher`
+
+    The configuration is only deserialized when a new generation has been published, reading
+    an unchanged configuration costs a header read.
+
+    Access is not zero-copy: every reader unpickles the payload into a private copy, so each worker
+    holds its own configuration besides the mapped segment. Publication saves workers from parsing,
+    interpolating and validating the file, not the memory of the configuration.
+
+    :param name: Name of the segment
+    :type name: str
+    """
+
+    def __init__(self, name):
+        self._shm = _shared_memory(name=name)
+        self._config = None
+        self.generation = 0
+
+    def published_generation(self):
+        """Return the generation currently published"""
+        return GENERATION.unpack_from(self._shm.buf, 0)[0]
+
+    def get(self):
+        """Return the last published configuration or ``None`` if nothing has been published"""
+        if self.published_generation() == self.generation:
+            return self._config
+
+        buf = self._shm.buf
+        delay = MIN_READ_DELAY
+        for _ in range(MAX_READ_ATTEMPTS):
+            header = HEADER.unpack_from(buf, 0)
+            generation, length = header
+            if not generation % 2:
+                try:
+                    with buf[HEADER.size:HEADER.size + length] as payload:
+                        config = pickle.loads(payload) if generation else None
+                except Exception:
+                    # Payload may have been overwritten while reading
+                    if HEADER.unpack_from(buf, 0) == header:
+                        raise
+                else:
+                    if HEADER.unpack_from(buf, 0) == header:
+                        self._config, self.generation = config, generation
+                        return config
+
+            # A publication is in progress, wait for the payload to be copied
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_READ_DELAY)
+
+        raise ConfigLoaderError('Could not read a consistent configuration from shared memory')
+
+    def close(self):
+        """Detach from the segment"""
+        self._config = None
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
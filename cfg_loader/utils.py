@@ -8,16 +8,90 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
+import contextlib
+import hashlib
+import mmap
+import os
+
 import yaml
 
+# Safe YAML loaders by backend name (libyaml is only available when PyYAML has been built with it)
+YAML_LOADERS = {'python': yaml.SafeLoader}
+if getattr(yaml, 'CSafeLoader', None) is not None:  # pragma: no branch
+    YAML_LOADERS['libyaml'] = yaml.CSafeLoader
+
+DEFAULT_YAML_BACKEND = 'libyaml' if 'libyaml' in YAML_LOADERS else 'python'
+
+
+def get_yaml_backend(backend=None):
+    """Return the name of the YAML backend to use
+
+    Falls back to the pure Python backend if libyaml is requested but not available.
+
+    :param backend: Requested backend (``'libyaml'`` or ``'python'``), defaults to the fastest available
+    :type backend: str
+    """
+    backend = backend or DEFAULT_YAML_BACKEND
+    if backend == 'libyaml' and backend not in YAML_LOADERS:
+        return 'python'
+
+    if backend not in YAML_LOADERS:
+        raise ValueError('Unknown YAML backend: {}'.format(backend))
+
+    return backend
+
 
-def parse_yaml(content):
-    return yaml.safe_load(content)
+def parse_yaml(content, backend=None):
+    """Parse YAML content with a safe loader
 
+    :param content: YAML content or stream (e.g. a memory-mapped file)
+    :type content: str | bytes | file
+    :param backend: YAML backend to use (c.f. :func:`get_yaml_backend`)
+    :type backend: str
+    """
+    return yaml.load(content, Loader=YAML_LOADERS[get_yaml_backend(backend)])
+
+
+def parse_yaml_documents(stream, backend=None):
+    """Lazily parse the documents of a multi-document YAML stream
+
+    :param stream: YAML content or stream
+    :type stream: str | bytes | file
+    :param backend: YAML backend to use (c.f. :func:`get_yaml_backend`)
+    :type backend: str
+    """
+    return yaml.load_all(stream, Loader=YAML_LOADERS[get_yaml_backend(backend)])
 
-def parse_yaml_file(path):
-    with open(path, 'rt') as f:
-        return parse_yaml(f.read())
+
+def parse_yaml_file(path, backend=None):
+    with map_file(path) as content:
+        return parse_yaml(content, backend)
+
+
+@contextlib.contextmanager
+def map_file(path):
+    """Memory-map a file for reading
+
+    The mapped file supports both the buffer protocol and the binary file interface so it can
+    be hashed or parsed without copying the whole file into memory.
+    Empty files and files that can not be mapped (e.g. pipes) are read into bytes.
+
+    :param path: Path to the file
+    :type path: str
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None
+
+        # Content is yielded outside of the except clause so errors of the caller are not chained to the mmap error
+        if mapped is None:
+            yield f.read()
+            return
+
+        with mapped:
+            yield mapped
 
 
 def add_prefix(dictionary, prefix):
@@ -29,3 +103,56 @@ def add_prefix(dictionary, prefix):
     :type prefix: str
     """
     return {'{}{}'.format(prefix, key): value for key, value in dictionary.items()}
+
+
+def deep_merge(base, override):
+    """Recursively merge override into base and return the result
+
+    Dictionaries are merged key by key, any other value in override replaces the value in base.
+    Inputs are not modified and subtrees that are not merged are shared with the inputs.
+
+    :param base: Base dictionary
+    :type base: dict
+    :param override: Dictionary with values taking precedence
+    :type override: dict
+
+    Example
+
+    >>> deep_merge({'db': {'host': 'localhost', 'port': 5432}}, {'db': {'host': 'db.local'}})
+    {'db': {'host': 'db.local', 'port': 5432}}
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def mapping_fingerprint(mapping):
+    """Return a hashable fingerprint of a mapping content or ``None`` if its values are not hashable
+
+    :param mapping: Mapping to fingerprint
+    :type mapping: dict
+    """
+    try:
+        return frozenset(mapping.items())
+    except TypeError:
+        return None
+
+
+def file_fingerprint(path, content_hash=False):
+    """Return a fingerprint of a file that changes when the file is modified
+
+    :param path: Path to the file
+    :type path: str
+    :param content_hash: Whether to hash the file content instead of using its metadata
+    :type content_hash: bool
+    """
+    if content_hash:
+        with map_file(path) as content:
+            return hashlib.sha256(content).hexdigest()
+
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,409 @@
+"""
+    cfg_loader.watcher
+    ~~~~~~~~~~~~~~~~~~
+
+    Implement hot-reloading of configuration files
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see :ref:`license` for more details.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import functools
+import logging
+import os
+import select
+import sys
+import threading
+import time
+
+from .utils import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# inotify flags (c.f. <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def file_signature(path):
+    """Return the metadata fingerprint of a file or ``None`` if it does not exist
+
+    :param path: Path to the file
+    :type path: str
+    """
+    try:
+        return file_fingerprint(path)
+    except OSError:
+        return None
+
+
+class PollingBackend:
+    """Change detection backend polling file metadata
+
+    :param path: Path to the watched file
+    :type path: str
+    :param interval: Number of seconds between two polls
+    :type interval: float
+    """
+
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self._signature = file_signature(path)
+
+    def wait(self, timeout):
+        """Wait for a change of the file and return whether one has been detected before timeout
+
+        :param timeout: Maximum number of seconds to wait
+        :type timeout: float
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            signature = file_signature(self.path)
+            if signature != self._signature:
+                self._signature = signature
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        """Release backend resources"""
+
+
+class InotifyBackend:
+    """Change detection backend using Linux inotify
+
+    Directories holding the file and its resolved target are watched so that atomic
+    replacements and symlink swaps are detected.
+
+    :param path: Path to the watched file
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        directories = {os.path.dirname(os.path.abspath(path)), os.path.dirname(os.path.realpath(path))}
+        for directory in directories:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), INOTIFY_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                self.close()
+                raise OSError(errno, 'inotify_add_watch failed on {}'.format(directory))
+
+    @classmethod
+    def is_available(cls):
+        """Whether inotify is available on the platform"""
+        if not sys.platform.startswith('linux'):
+            return False
+        library = ctypes.util.find_library('c')
+        return library is not None and hasattr(ctypes.CDLL(library), 'inotify_init1')
+
+    def wait(self, timeout):
+        """Wait for events in watched directories and return whether some occurred before timeout
+
+        :param timeout: Maximum number of seconds to wait
+        :type timeout: float
+        """
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not readable:
+            return False
+
+        # Drain pending events, the watcher compares file signatures to filter out unrelated ones
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        return True
+
+    def close(self):
+        """Release backend resources"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_backend(path, use_inotify=True, interval=1.0):
+    """Return the best available change detection backend for a file
+
+    :param path: Path to the watched file
+    :type path: str
+    :param use_inotify: Whether to use inotify when available
+    :type use_inotify: bool
+    :param interval: Number of seconds between two polls when inotify is not used
+    :type interval: float
+    """
+    if use_inotify and InotifyBackend.is_available():
+        try:
+            return InotifyBackend(path)
+        except OSError:
+            logger.warning('Could not use inotify to watch %s, falling back to polling', path)
+    return PollingBackend(path, interval=interval)
+
+
+class _BaseConfigWatcher:
+    """Change detection and error reporting shared by :class:`ConfigWatcher` and :class:`AsyncConfigWatcher`"""
+
+    def __init__(self, loader, config_file=None, substitution_mapping=None, debounce=0.1, interval=1.0,
+                 use_inotify=True):
+        self.loader = loader
+        self.config_file = loader.get_config_file(config_file)
+        self.substitution_mapping = substitution_mapping
+        self.debounce = debounce
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.config = None
+        self.generation = 0
+        self._signature = None
+        self._error_subscribers = []
+        self._stop = threading.Event()
+
+    def on_error(self, callback):
+        """Register a callback called with the exception raised by a failed reload
+
+        :param callback: Callable taking the exception
+        :type callback: callable
+        """
+        self._error_subscribers.append(callback)
+        return callback
+
+    def _create_backend(self):
+        # Backend must be created before the initial load so that no change can be missed in between
+        return create_backend(self.config_file, self.use_inotify, self.interval)
+
+    def _wait_for_change(self, backend):
+        """Block until the file changed and a burst of changes settled
+
+        Return ``False`` if nothing changed within the polling interval or if the watcher is stopped.
+        """
+        if not backend.wait(self.interval):
+            return False
+
+        # Wait for the burst of changes to settle
+        while not self._stop.is_set() and backend.wait(self.debounce):
+            pass
+
+        if self._stop.is_set():
+            return False
+
+        return file_signature(self.config_file) not in (None, self._signature)
+
+    def _report_error(self, error):
+        logger.error('Could not reload configuration file %s', self.config_file, exc_info=error)
+        for callback in list(self._error_subscribers):
+            try:
+                callback(error)
+            except Exception:
+                logger.exception('Config reload error subscriber %r failed', callback)
+
+
+class ConfigWatcher(_BaseConfigWatcher):
+    """Watch a configuration file and reload it in a background thread when it changes
+
+    Bursts of changes are debounced and the file is reloaded through the loader pipeline.
+    The published configuration is swapped atomically and subscribers are notified with the
+    new configuration. If a reload fails the previous configuration is kept.
+
+    :param loader: Loader used to load the configuration file
+    :type loader: :class:`~cfg_loader.loader.FileConfigLoader`
+    :param config_file: Path to the configuration file (resolved by the loader if not provided)
+    :type config_file: str
+    :param substitution_mapping: Mapping with values to substitute
+    :type substitution_mapping: dict
+    :param debounce: Number of quiet seconds to wait after a change before reloading
+    :type debounce: float
+    :param interval: Number of seconds between two polls when inotify is not used
+    :type interval: float
+    :param use_inotify: Whether to use inotify when available
+    :type use_inotify: bool
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Register a callback called with the new configuration after each reload
+
+        :param callback: Callable taking the new configuration
+        :type callback: callable
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Unregister a reload callback
+
+        :param callback: Callback previously registered with :meth:`subscribe`
+        :type callback: callable
+        """
+        self._subscribers.remove(callback)
+
+    def reload(self):
+        """Load the configuration file, publish it and notify subscribers"""
+        with self._lock:
+            self._signature = file_signature(self.config_file)
+            config = self.loader.load(self.config_file, self.substitution_mapping)
+            self.config = config
+            self.generation += 1
+
+        for callback in list(self._subscribers):
+            try:
+                callback(config)
+            except Exception:
+                logger.exception('Config reload subscriber %r failed', callback)
+
+        return config
+
+    def start(self):
+        """Load the configuration and start watching the file"""
+        if self._thread is not None:
+            raise RuntimeError('Watcher already started')
+
+        backend = self._create_backend()
+        try:
+            self.reload()
+        except Exception:
+            backend.close()
+            raise
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(backend,), name='cfg-loader-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop watching the file
+
+        :param timeout: Maximum number of seconds to wait for the watching thread
+        :type timeout: float
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self, backend):
+        try:
+            while not self._stop.is_set():
+                if not self._wait_for_change(backend):
+                    continue
+
+                try:
+                    self.reload()
+                except Exception as e:
+                    self._report_error(e)
+        finally:
+            backend.close()
+
+
+class AsyncConfigWatcher(_BaseConfigWatcher):
+    """Asynchronous iterator over successive versions of a configuration file
+
+    The first iteration returns the initially loaded configuration, following iterations wait for
+    the file to change and return the reloaded configuration. Waiting for changes and loading run
+    in an executor so the event loop is never blocked. Failed reloads are logged and reported to
+    error subscribers, the iterator then keeps watching.
+
+    It accepts the same arguments as :class:`ConfigWatcher`
+
+    :param executor: Executor to run blocking operations in, defaults to the event loop default executor
+    :type executor: concurrent.futures.Executor
+
+    Example
+
+    .. code-block:: python
+
+        async with AsyncConfigWatcher(loader) as watcher:
+            async for config in watcher:
+                apply(config)
+    """
+
+    def __init__(self, *args, executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+        self._backend = None
+
+    def close(self):
+        """Stop watching the file"""
+        self._stop.set()
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._stop.is_set():
+            raise StopAsyncIteration
+
+        if self._backend is None:
+            self._backend = await self._run(self._create_backend)
+            return await self.reload()
+
+        while not self._stop.is_set():
+            if not await self._wait():
+                continue
+
+            try:
+                return await self.reload()
+            except Exception as e:
+                self._report_error(e)
+
+        raise StopAsyncIteration
+
+    async def reload(self):
+        """Load the configuration file and publish it"""
+        self._signature = file_signature(self.config_file)
+        self.config = await self.loader.aload(self.config_file, self.substitution_mapping, executor=self.executor)
+        self.generation += 1
+        return self.config
+
+    async def _wait(self):
+        try:
+            return await self._run(self._wait_for_change, self._backend)
+        except (OSError, ValueError):
+            # The backend has been closed while waiting
+            if self._stop.is_set():
+                return False
+            raise
+
+    def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor, functools.partial(func, *args))
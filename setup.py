@@ -32,7 +32,7 @@ setup(
     maintainer='ConsenSys France',
     description='A library that allows to easily load configuration settings.',
     long_description=read('README.rst'),
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
         'marshmallow==3.0.0b11',
         'PyYAML>=3.12',
@@ -52,6 +52,11 @@ setup(
             'sphinx',
             'sphinx_rtd_theme',
         ],
+        'formats': [
+            'orjson',
+            'toml; python_version < "3.11"',
+            'msgpack',
+        ],
     },
     zip_safe=False,
     platforms='any',
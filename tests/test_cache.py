@@ -0,0 +1,171 @@
+"""
+    tests.test_cache
+    ~~~~~~~~~~~~~~~~
+
+    Test caches
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import concurrent.futures
+import os
+import pickle
+import time
+
+import pytest
+
+from cfg_loader.cache import LRUCache, ConfigCache, ParseCache, StatCache
+from cfg_loader.utils import parse_yaml
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.set('key1', 'value1')
+    cache.set('key2', 'value2')
+    assert cache.get('key1') == 'value1'
+
+    # key2 is the least recently used entry
+    cache.set('key3', 'value3')
+    assert 'key2' not in cache
+    assert len(cache) == 2
+
+    assert cache.get_or_set('key1', lambda: 'other') == 'value1'
+    assert cache.get_or_set('key4', lambda: 'value4') == 'value4'
+
+    cache.invalidate('key4')
+    assert cache.get('key4', 'default') == 'default'
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(maxsize=0)
+    cache.set('key', 'value')
+    assert 'key' not in cache
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 10)
+    assert 'key' not in cache
+    assert cache.get('key') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_config_cache_key(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('key: value')
+
+    for cache in [ConfigCache(), ConfigCache(content_hash=True)]:
+        key = cache.key_for(str(config_file), {'VARIABLE': 'value'})
+        assert key == cache.key_for(str(config_file), {'VARIABLE': 'value'})
+        assert key != cache.key_for(str(config_file), {'VARIABLE': 'other'})
+        assert cache.key_for(str(config_file), {'VARIABLE': ['unhashable']}) is None
+
+    cache = ConfigCache(content_hash=True)
+    key = cache.key_for(str(config_file), {})
+    config_file.write('key: other')
+    assert cache.key_for(str(config_file), {}) != key
+
+
+def test_parse_cache(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('key: value')
+    cache_dir = str(tmpdir.join('cache'))
+    cache = ParseCache(cache_dir)
+
+    calls = []
+
+    def parser(content):
+        calls.append(content)
+        return parse_yaml(content)
+
+    assert cache.load(str(config_file), parser) == {'key': 'value'}
+    assert cache.load(str(config_file), parser) == {'key': 'value'}
+    assert len(calls) == 1
+    assert os.path.exists(cache.path_for(cache.key_for(b'key: value')))
+    assert os.path.exists(cache.index_path_for(str(config_file)))
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Another process sharing the cache directory reuses the entry
+    assert ParseCache(cache_dir).load(str(config_file), parser) == {'key': 'value'}
+    assert len(calls) == 1
+
+    # Entry of the previous version of the file is removed
+    config_file.write('key: other')
+    assert cache.load(str(config_file), parser) == {'key': 'other'}
+    assert len(calls) == 2
+    assert not os.path.exists(cache.path_for(cache.key_for(b'key: value')))
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Files are tracked independently
+    other_file = tmpdir.join('other.yml')
+    other_file.write('key: value')
+    assert cache.load(str(other_file), parser) == {'key': 'value'}
+    assert cache.load(str(config_file), parser) == {'key': 'other'}
+    assert len(os.listdir(cache_dir)) == 4
+
+    cache.clear()
+    assert os.listdir(cache_dir) == []
+
+
+def test_parse_cache_corrupted_entry(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('key: value')
+    cache = ParseCache(str(tmpdir.join('cache')))
+
+    cache.load(str(config_file), parse_yaml)
+    key = cache.key_for(b'key: value')
+    with open(cache.path_for(key), 'wb') as f:
+        f.write(b'corrupted')
+
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.path_for(key))
+    assert cache.load(str(config_file), parse_yaml) == {'key': 'value'}
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_stat_cache_prefetch(tmpdir, max_workers):
+    paths = [str(tmpdir.join('file{}'.format(index))) for index in range(4)]
+    for path in paths[:2]:
+        open(path, 'w').close()
+
+    stat_cache = StatCache(max_workers=max_workers)
+    stat_cache.prefetch(paths + paths)
+    assert len(stat_cache) == 4
+    assert stat_cache.stat(paths[0]).st_size == 0
+    assert stat_cache.stat(paths[3]) is None
+    assert stat_cache.misses == 0
+
+    # Cached results are not stat again
+    os.remove(paths[0])
+    stat_cache.prefetch(paths)
+    assert stat_cache.stat(paths[0]) is not None
+    stat_cache.invalidate(paths[0])
+    assert stat_cache.stat(paths[0]) is None
+
+
+def test_stat_cache_executor():
+    assert StatCache().get_executor() is None
+
+    # Thread pool is created once and reused by every prefetch
+    stat_cache = StatCache(max_workers=2)
+    executor = stat_cache.get_executor()
+    assert isinstance(executor, concurrent.futures.ThreadPoolExecutor)
+    assert stat_cache.get_executor() is executor
+    assert pickle.loads(pickle.dumps(stat_cache))._executor is None
+    executor.shutdown()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        stat_cache = StatCache(executor=executor)
+        assert stat_cache.get_executor() is executor
+        stat_cache.prefetch(['.', '..'])
+        assert len(stat_cache) == 2
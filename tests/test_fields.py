@@ -8,8 +8,12 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import os
+import stat
+
 import pytest
-from cfg_loader.fields import PathValidator, Path
+from cfg_loader.cache import StatCache
+from cfg_loader.fields import PathValidator, Path, PathList, is_readable
 from marshmallow import Schema, ValidationError
 
 
@@ -30,3 +34,79 @@ def test_path_field(config_path):
     assert SchemaTest().load(data) == {
         'path_field': config_path,
     }
+
+
+def test_path_validator_kind(config_path):
+    with pytest.raises(ValidationError) as e:
+        PathValidator(kind='directory')(config_path)
+    assert e.value.messages == ['Path "{}" is not a directory'.format(config_path)]
+    assert PathValidator(kind='file')(config_path) == config_path
+
+    directory = os.path.dirname(config_path)
+    with pytest.raises(ValidationError):
+        PathValidator(kind='file')(directory)
+    assert PathValidator(kind='directory', readable=True)(directory) == directory
+
+    with pytest.raises(ValueError):
+        PathValidator(kind='socket')
+
+
+def test_path_validator_stat_cache(config_path):
+    stat_cache = StatCache()
+    validator = PathValidator(stat_cache=stat_cache)
+    assert validator(config_path) == config_path
+    with pytest.raises(ValidationError):
+        validator('invalid')
+
+    assert config_path in stat_cache
+    assert stat_cache.stat('invalid') is None
+    assert stat_cache.hits == 1
+
+
+def test_is_readable(monkeypatch):
+    def make_stat(mode, uid=1000, gid=1000):
+        return os.stat_result((stat.S_IFREG | mode, 0, 0, 1, uid, gid, 0, 0, 0, 0))
+
+    monkeypatch.setattr(os, 'geteuid', lambda: 1000)
+    monkeypatch.setattr(os, 'getegid', lambda: 1000)
+    monkeypatch.setattr(os, 'getgroups', lambda: [1000])
+    assert is_readable(make_stat(0o400))
+    assert not is_readable(make_stat(0o044))
+    assert is_readable(make_stat(0o040, uid=0))
+    assert not is_readable(make_stat(0o404, uid=0))
+    assert is_readable(make_stat(0o004, uid=0, gid=0))
+    assert not is_readable(make_stat(0o440, uid=0, gid=0))
+
+    monkeypatch.setattr(os, 'geteuid', lambda: 0)
+    assert is_readable(make_stat(0o000))
+
+    monkeypatch.setattr(os, 'geteuid', lambda: 1000)
+    validator = PathValidator(readable=True)
+    monkeypatch.setattr(validator, 'stat', lambda value: make_stat(0o000, uid=0, gid=0))
+    with pytest.raises(ValidationError) as e:
+        validator('secret')
+    assert e.value.messages == ['Path "secret" is not readable']
+
+
+def test_path_list_field(config_path):
+    class SchemaTest(Schema):
+        paths = PathList(kind='file')
+
+    schema = SchemaTest()
+    assert schema.load({'paths': [config_path, config_path]}) == {'paths': [config_path, config_path]}
+
+    with pytest.raises(ValidationError) as e:
+        schema.load({'paths': [config_path, 'invalid', os.path.dirname(config_path)]})
+    assert set(e.value.messages['paths']) == {1, 2}
+
+    stat_cache = StatCache(max_workers=1)
+
+    class SharedSchemaTest(Schema):
+        paths = PathList(stat_cache=stat_cache)
+        path = Path(stat_cache=stat_cache)
+
+    assert SharedSchemaTest().load({'paths': [config_path], 'path': config_path}) == {
+        'paths': [config_path],
+        'path': config_path,
+    }
+    assert len(stat_cache) == 1
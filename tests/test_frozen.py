@@ -0,0 +1,50 @@
+"""
+    tests.test_frozen
+    ~~~~~~~~~~~~~~~~~
+
+    Test immutable configuration objects
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import pickle
+
+import pytest
+
+from cfg_loader.frozen import FrozenConfig, freeze, thaw
+
+
+def test_freeze():
+    shared = {'key': 'value'}
+    config = freeze({
+        'field': 'value',
+        'many': ['element', shared],
+        'tags': {'tag'},
+        'shared': shared,
+    })
+
+    assert isinstance(config, FrozenConfig)
+    assert config.field == 'value'
+    assert config['many'] == ('element', {'key': 'value'})
+    assert config.tags == frozenset({'tag'})
+    assert config.many[1] is config.shared
+    assert freeze(config) is config
+
+    with pytest.raises(AttributeError):
+        config.unknown
+    with pytest.raises(AttributeError):
+        config.field = 'other'
+    with pytest.raises(TypeError):
+        config['field'] = 'other'
+
+
+def test_thaw():
+    raw = {'field': 'value', 'many': ['element', {'key': 'value'}]}
+    assert thaw(freeze(raw)) == raw
+    assert freeze(raw).thaw() == raw
+
+
+def test_frozen_config_pickle():
+    config = freeze({'field': 'value', 'nested': {'key': 'value'}})
+    assert pickle.loads(pickle.dumps(config)) == config
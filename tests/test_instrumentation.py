@@ -0,0 +1,129 @@
+"""
+    tests.test_instrumentation
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test instrumentation of the configuration loading pipeline
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import pickle
+
+import pytest
+from marshmallow import fields
+
+from cfg_loader.exceptions import ConfigFileNotFoundError, ValidationError
+from cfg_loader.instrumentation import Instrumentation, MetricsCollector, count_errors
+from cfg_loader.loader import BaseConfigLoader, YamlConfigLoader, LayeredConfigLoader
+from cfg_loader.schema import ConfigSchema
+from .conftest import BASE_CONFIG_PATH
+
+
+class BaseConfigSchema(ConfigSchema):
+    name = fields.Str()
+    path = fields.Str()
+
+
+class ConfigSchemaTest(ConfigSchema):
+    base = fields.Nested(BaseConfigSchema)
+    port = fields.Int()
+
+
+class RecordingInstrumentation(Instrumentation):
+
+    def __init__(self):
+        self.events = []
+
+    def on_stage(self, name, duration, failed):
+        assert duration >= 0
+        self.events.append((name, failed))
+
+
+def test_yaml_config_loader_stages():
+    instrumentation = RecordingInstrumentation()
+    loader = YamlConfigLoader(ConfigSchemaTest, {'PATH': 'folder', 'SECRET': 'secret'},
+                              instrumentation=instrumentation)
+    loader.load(BASE_CONFIG_PATH)
+
+    assert instrumentation.events == [
+        ('check_file', False),
+        ('parse', False),
+        ('interpolate', False),
+        ('validate', False),
+        ('load', False),
+    ]
+
+    instrumentation.events = []
+    with pytest.raises(ConfigFileNotFoundError):
+        loader.load('unknown.yml')
+    assert instrumentation.events == [('check_file', True), ('load', True)]
+
+
+def test_metrics_collector():
+    metrics = MetricsCollector()
+    loader = YamlConfigLoader(ConfigSchemaTest, {'PATH': 'folder', 'SECRET': 'secret'}, instrumentation=metrics)
+    loader.load(BASE_CONFIG_PATH)
+    loader.load(BASE_CONFIG_PATH)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot['stages']) == {'check_file', 'parse', 'interpolate', 'validate', 'load'}
+    assert snapshot['stages']['load']['count'] == 2
+    assert snapshot['stages']['load']['failures'] == 0
+    assert snapshot['stages']['load']['max'] <= snapshot['stages']['load']['total']
+    assert snapshot['bytes_read'] > 0
+    assert snapshot['substitutions'] == 4
+    assert snapshot['validation_errors'] == 0
+
+    loader = BaseConfigLoader(ConfigSchemaTest, instrumentation=metrics)
+    with pytest.raises(ValidationError):
+        loader.load({'port': 'invalid'})
+    with pytest.raises(ValidationError):
+        loader.load({'base': {'name': 1, 'path': 2}})
+    assert metrics.validation_errors == 3
+    assert metrics.stages['validate'].failures == 2
+
+    metrics.reset()
+    assert metrics.snapshot() == {'stages': {}, 'bytes_read': 0, 'substitutions': 0, 'validation_errors': 0,
+                                  'variables': {}, 'defaulted': {}, 'missing': {}, 'unused_variables': []}
+
+
+def test_metrics_collector_variables():
+    metrics = MetricsCollector()
+    loader = BaseConfigLoader(ConfigSchemaTest, {'NAME': 'app', 'EMPTY': '', 'UNUSED': 'value'},
+                              instrumentation=metrics)
+    loader.load({'base': {'name': '${NAME}', 'path': '${EMPTY:-/default}'}, 'port': '${PORT-80}'})
+    loader.load({'base': {'name': '${NAME}-${NAME}'}})
+
+    snapshot = metrics.snapshot()
+    assert snapshot['substitutions'] == 5
+    assert snapshot['variables'] == {'NAME': 3, 'EMPTY': 1, 'PORT': 1}
+    assert snapshot['defaulted'] == {'EMPTY': 1, 'PORT': 1}
+    assert snapshot['missing'] == {'PORT': 1}
+    assert snapshot['unused_variables'] == ['UNUSED']
+    assert metrics.unused_variables == {'UNUSED'}
+
+
+def test_metrics_collector_pickle():
+    metrics = MetricsCollector()
+    loader = BaseConfigLoader(ConfigSchemaTest, instrumentation=metrics)
+    loader.load({'port': 1})
+
+    loader = pickle.loads(pickle.dumps(loader))
+    assert loader.instrumentation.stages == {}
+    loader.load({'port': 1})
+    assert loader.instrumentation.stages['load'].count == 1
+
+
+def test_layered_config_loader_stages():
+    instrumentation = RecordingInstrumentation()
+    loader = LayeredConfigLoader(ConfigSchemaTest, layers=[BASE_CONFIG_PATH, {'port': '80'}],
+                                 instrumentation=instrumentation)
+    assert loader.load()['port'] == 80
+
+    assert [name for name, _ in instrumentation.events] == ['check_file', 'parse', 'validate', 'load']
+
+
+def test_count_errors():
+    assert count_errors({}) == 0
+    assert count_errors({'field': ['error'], 'nested': {'field': ['error', 'error']}, '_schema': ['error']}) == 4
@@ -8,10 +8,15 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import sys
+from collections import OrderedDict, namedtuple
+
 import pytest
 
-from cfg_loader.exceptions import UnsetRequiredSubstitution, InvalidSubstitution
-from cfg_loader.interpolator import SubstitutionTemplate, Interpolator
+from cfg_loader.exceptions import UnsetRequiredSubstitution, InvalidSubstitution, CircularReferenceError
+from cfg_loader.frozen import FrozenConfig
+from cfg_loader.interpolator import SubstitutionTemplate, Interpolator, Placeholder, SubstitutionStats, \
+    RECURSION_DEPTH_LIMIT, compile_template
 
 
 @pytest.fixture(scope='module')
@@ -119,6 +124,30 @@ def test_substitution():
     _test_substitution_invalid()
 
 
+def test_compile_template():
+    plan = SubstitutionTemplate('$$HOME ${VARIABLE:-default}/$OTHER${').compile()
+    assert plan.segments == (
+        '$HOME ',
+        Placeholder('VARIABLE', ':-', 'default'),
+        '/',
+        Placeholder('OTHER', None, None),
+        Placeholder(None, None, None),
+        '{',
+    )
+    assert plan.variables == {'VARIABLE', 'OTHER'}
+    assert not plan.is_static
+
+    plan = SubstitutionTemplate('no substitution pattern').compile()
+    assert plan.segments == ('no substitution pattern',)
+    assert plan.is_static
+    assert plan.substitute({}) == 'no substitution pattern'
+
+
+def test_compile_template_cache():
+    assert compile_template('${VARIABLE}/app') is compile_template('${VARIABLE}/app')
+    assert compile_template('${VARIABLE}/app').substitute({'VARIABLE': 'src'}) == 'src/app'
+
+
 def _test_valid_interpolation(interpolator):
     raw_input = {
         'key1': '${VARIABLE}',
@@ -146,3 +175,223 @@ def _test_invalid_interpolation(interpolator):
 def test_interpolator(interpolator):
     _test_valid_interpolation(interpolator)
     _test_invalid_interpolation(interpolator)
+
+
+def test_substitution_stats():
+    mapping = {'VARIABLE': 'value', 'EMPTY': '', 'UNUSED': 'value'}
+    interpolator = Interpolator(substitution_mapping=mapping)
+    stats = SubstitutionStats(mapping)
+
+    result = interpolator.interpolate_recursive({
+        'key1': '${VARIABLE}/$VARIABLE',
+        'key2': ['${EMPTY:-default}', '${EMPTY-default}', '${UNSET:-default}', '$$ESCAPED', 'static'],
+        'key3': {'key4': '${OTHER-default}'},
+    }, stats)
+    assert result['key2'] == ['default', '', 'default', '$ESCAPED', 'static']
+
+    assert stats.used == {'VARIABLE': 2, 'EMPTY': 2, 'UNSET': 1, 'OTHER': 1}
+    assert stats.total == 6
+    assert stats.defaulted == {'EMPTY', 'UNSET', 'OTHER'}
+    assert stats.missing == {'UNSET', 'OTHER'}
+    assert stats.unused == {'UNUSED'}
+
+    stats = SubstitutionStats()
+    with pytest.raises(UnsetRequiredSubstitution):
+        interpolator.interpolate('${UNSET?error}', stats)
+    assert stats.missing == {'UNSET'}
+    assert stats.defaulted == set()
+    assert stats.unused == set()
+
+
+def test_interpolate_strings(interpolator):
+    strings = ['host-{}'.format(index) for index in range(100)]
+    assert interpolator.interpolate_strings(strings) is strings
+
+    strings[10] = '${VARIABLE}-10'
+    assert interpolator.interpolate_strings(strings)[10] == 'value-10'
+    assert interpolator.interpolate_recursive({'hosts': strings})['hosts'][10] == 'value-10'
+
+    with pytest.raises(TypeError):
+        interpolator.interpolate_strings(['${VARIABLE}', 1])
+    assert interpolator.interpolate_recursive(['${VARIABLE}', 1, ['${VARIABLE}']]) == ['value', 1, ['value']]
+
+    with pytest.raises(InvalidSubstitution):
+        interpolator.interpolate_recursive(['static', '${VARIABLE'])
+
+
+def test_interpolate_recursive_copy_on_write(interpolator):
+    document = {
+        'static': {'key': 'value', 'list': ['element', 1, {'key': 'value'}]},
+        'escaped': '$$ESCAPED',
+        'dynamic': {'key': '${VARIABLE}', 'list': ['element', 1, {'key': '${VARIABLE}'}]},
+        'hosts': ['host-1', '${VARIABLE}'],
+    }
+    result = interpolator.interpolate_recursive(document)
+
+    assert result is not document
+    assert result['static'] is document['static']
+    assert result['escaped'] == '$ESCAPED'
+    assert result['dynamic']['list'][0] == 'element'
+    assert result['dynamic']['list'][2] == {'key': 'value'}
+    assert result['hosts'] == ['host-1', 'value']
+    assert document['dynamic'] == {'key': '${VARIABLE}', 'list': ['element', 1, {'key': '${VARIABLE}'}]}
+    assert document['hosts'] == ['host-1', '${VARIABLE}']
+
+    assert interpolator.interpolate_recursive(document['static']) is document['static']
+    strings = ['static', 'element']
+    assert interpolator.interpolate_recursive(strings) is strings
+
+
+def test_interpolate_recursive_types(interpolator):
+    Point = namedtuple('Point', ['x', 'y'])
+
+    result = interpolator.interpolate_recursive({
+        'tuple': ('${VARIABLE}', 1),
+        'set': {'${VARIABLE}', 'static'},
+        'frozenset': frozenset(['${VARIABLE}']),
+        'namedtuple': Point('${VARIABLE}', 2),
+        'ordered': OrderedDict([('b', '${VARIABLE}'), ('a', 'static')]),
+        'mapping': FrozenConfig({'key': ['${VARIABLE}']}),
+        'bytes': b'$bytes',
+    })
+    assert result == {
+        'tuple': ('value', 1),
+        'set': {'value', 'static'},
+        'frozenset': frozenset(['value']),
+        'namedtuple': Point('value', 2),
+        'ordered': OrderedDict([('b', 'value'), ('a', 'static')]),
+        'mapping': {'key': ['value']},
+        'bytes': b'$bytes',
+    }
+    assert isinstance(result['namedtuple'], Point)
+    assert isinstance(result['ordered'], OrderedDict)
+    assert isinstance(result['mapping'], FrozenConfig)
+
+
+@pytest.mark.parametrize('container', [
+    lambda value: {'key': value},
+    lambda value: [value, 'static'],
+    lambda value: (value,),
+])
+def test_interpolate_recursive_deep(interpolator, container):
+    depth = max(RECURSION_DEPTH_LIMIT, sys.getrecursionlimit()) * 2
+    document = '${VARIABLE}'
+    for _ in range(depth):
+        document = container(document)
+
+    result = interpolator.interpolate_recursive(document)
+    for _ in range(depth):
+        result = result[0] if not isinstance(result, dict) else result['key']
+    assert result == 'value'
+
+    static = 'static'
+    for _ in range(depth):
+        static = container(static)
+    assert interpolator.interpolate_recursive(static) is static
+
+
+@pytest.mark.parametrize('depth', [0, RECURSION_DEPTH_LIMIT * 2])
+def test_interpolate_recursive_circular_reference(interpolator, depth):
+    cycle = {'key': '${VARIABLE}'}
+    cycle['self'] = [cycle]
+
+    document = cycle
+    for _ in range(depth):
+        document = {'nested': document}
+
+    with pytest.raises(CircularReferenceError):
+        interpolator.interpolate_recursive(document)
+
+    shared = {'key': '${VARIABLE}'}
+    result = interpolator.interpolate_recursive({'first': shared, 'second': [shared, shared]})
+    assert result['first'] == result['second'][0] == {'key': 'value'}
+
+
+def test_interpolate_recursive_shared_subtrees(interpolator):
+    shared = {'key': '${VARIABLE}', 'hosts': ['${VARIABLE}']}
+    stats = SubstitutionStats()
+    result = interpolator.interpolate_recursive({'first': shared, 'second': [shared, (shared,)]}, stats)
+
+    assert result['first'] == {'key': 'value', 'hosts': ['value']}
+    assert result['second'][0] is result['first']
+    assert result['second'][1][0] is result['first']
+    assert stats.used == {'VARIABLE': 2}
+
+
+def test_compile_recursive(interpolator):
+    document = {
+        'key1': '${VARIABLE}',
+        'key2': [
+            'element',
+            {'key3': '$${ESCAPED}', 'key4': 'static'},
+        ],
+        'key5': {
+            'key6': 'static',
+        },
+    }
+    tree = interpolator.compile_recursive(document)
+    assert set(tree.plans) == {('key1',), ('key2', 1, 'key3')}
+    assert len(tree) == 2
+
+    result = tree.render({'VARIABLE': 'value'})
+    assert result == {
+        'key1': 'value',
+        'key2': [
+            'element',
+            {'key3': '${ESCAPED}', 'key4': 'static'},
+        ],
+        'key5': {
+            'key6': 'static',
+        },
+    }
+    assert result['key5'] is document['key5']
+    assert document['key1'] == '${VARIABLE}'
+    assert tree.render({'VARIABLE': 'other'})['key1'] == 'other'
+
+    assert interpolator.compile_recursive('${VARIABLE}').render({'VARIABLE': 'value'}) == 'value'
+
+    with pytest.raises(InvalidSubstitution):
+        interpolator.compile_recursive({'key': '${VARIABLE'}).render({})
+
+
+def test_compile_recursive_types(interpolator):
+    Point = namedtuple('Point', ['x', 'y'])
+    document = {
+        'tuple': ('${VARIABLE}', 'static'),
+        'set': frozenset(['${VARIABLE}-set']),
+        'named': Point('${VARIABLE}', 1),
+        'mapping': OrderedDict([('key', '${VARIABLE}')]),
+    }
+    tree = interpolator.compile_recursive(document)
+    assert tree.render({'VARIABLE': 'value'}) == {
+        'tuple': ('value', 'static'),
+        'set': frozenset(['value-set']),
+        'named': Point('value', 1),
+        'mapping': OrderedDict([('key', 'value')]),
+    }
+
+
+def test_compile_recursive_deep(interpolator):
+    depth = sys.getrecursionlimit() * 2
+    document = {'key': '${VARIABLE}'}
+    for _ in range(depth):
+        document = {'nested': [document]}
+
+    tree = interpolator.compile_recursive(document)
+    assert len(tree) == 1
+    result = tree.render({'VARIABLE': 'value'})
+    result = tree.rerender(result, {'VARIABLE': 'other'}, tree.paths_for(['VARIABLE']))
+    for _ in range(depth):
+        result = result['nested'][0]
+    assert result == {'key': 'other'}
+
+
+def test_compile_recursive_circular_reference(interpolator):
+    cycle = {'key': '${VARIABLE}'}
+    cycle['self'] = [cycle]
+    with pytest.raises(CircularReferenceError):
+        interpolator.compile_recursive({'nested': cycle})
+
+    shared = {'key': '${VARIABLE}'}
+    tree = interpolator.compile_recursive({'first': shared, 'second': [shared]})
+    assert set(tree.plans) == {('first', 'key'), ('second', 0, 'key')}
@@ -0,0 +1,145 @@
+"""
+    tests.test_lazy
+    ~~~~~~~~~~~~~~~
+
+    Test lazily validated configuration
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import pytest
+from marshmallow import fields
+
+from cfg_loader.exceptions import ValidationError
+from cfg_loader.fields import UnwrapNested
+from cfg_loader.frozen import FrozenConfig
+from cfg_loader.lazy import LazyConfig
+from cfg_loader.loader import BaseConfigLoader, YamlConfigLoader, LayeredConfigLoader
+from cfg_loader.schema import ConfigSchema
+
+
+class NestedConfigSchemaTest(ConfigSchema):
+    field = fields.Int()
+
+
+class ConfigSchemaTest(ConfigSchema):
+    field = fields.Str()
+    renamed = fields.Str(attribute='attribute_field')
+    default = fields.Float(missing=13.2)
+    nested = fields.Nested(NestedConfigSchemaTest)
+    unwrap = UnwrapNested(NestedConfigSchemaTest, prefix='unwrapped_')
+
+
+@pytest.fixture
+def raw_config():
+    yield {
+        'field': '${VARIABLE}',
+        'renamed': 'value',
+        'nested': {
+            'field': 'invalid',
+        },
+        'unwrap': {
+            'field': '${VARIABLE_INT}',
+        },
+        'extra': '${VARIABLE}',
+    }
+
+
+def test_lazy_config(raw_config):
+    config = LazyConfig(ConfigSchemaTest(substitution_mapping={'VARIABLE': 'substitution', 'VARIABLE_INT': '24'}),
+                        raw_config)
+
+    assert config['field'] == 'substitution'
+    assert config['attribute_field'] == 'value'
+    assert config['default'] == 13.2
+    assert config['extra'] == 'substitution'
+    assert config['unwrapped_field'] == 24
+    assert config.loaded_fields == {'field', 'renamed', 'default', 'unwrap'}
+
+    assert 'unknown' not in config
+    with pytest.raises(KeyError):
+        config['unknown']
+
+    # Invalid section is only validated when accessed
+    with pytest.raises(ValidationError):
+        config['nested']
+
+
+def test_lazy_config_contains(raw_config):
+    config = LazyConfig(ConfigSchemaTest(substitution_mapping={'VARIABLE': 'substitution', 'VARIABLE_INT': '24'}),
+                        raw_config)
+
+    # Membership does not load fields so an invalid field does not raise
+    for key in ['field', 'attribute_field', 'default', 'nested', 'unwrapped_field', 'extra']:
+        assert key in config
+    for key in ['renamed', 'unwrap', 'unwrapped_unknown', 'unknown', 0]:
+        assert key not in config
+    assert config.loaded_fields == set()
+
+    del raw_config['field']
+    assert 'field' not in config
+    assert config['default'] == 13.2
+    assert 'default' in config
+
+
+def test_lazy_config_validate_all(raw_config):
+    config = LazyConfig(ConfigSchemaTest(substitution_mapping={'VARIABLE': 'substitution', 'VARIABLE_INT': '24'}),
+                        raw_config)
+
+    with pytest.raises(ValidationError):
+        config.validate_all()
+
+    raw_config['nested']['field'] = '4'
+    assert dict(config) == {
+        'field': 'substitution',
+        'attribute_field': 'value',
+        'default': 13.2,
+        'nested': {
+            'field': 4,
+        },
+        'unwrapped_field': 24,
+        'extra': 'substitution',
+    }
+    assert len(config) == 6
+
+
+def test_config_loader_load_lazy(raw_config):
+    config_loader = BaseConfigLoader(ConfigSchemaTest, substitution_mapping={'VARIABLE': 'substitution'})
+    config = config_loader.load_lazy(raw_config)
+    assert isinstance(config, LazyConfig)
+    assert config['field'] == 'substitution'
+
+
+def test_file_config_loader_load_lazy(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('field: ${VARIABLE}\nnested:\n  field: invalid\n')
+
+    config_loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'VARIABLE': 'substitution'})
+    config = config_loader.load_lazy(str(config_file))
+    assert isinstance(config, LazyConfig)
+    assert config['field'] == 'substitution'
+    with pytest.raises(ValidationError):
+        config['nested']
+
+    config_loader = LayeredConfigLoader(ConfigSchemaTest, substitution_mapping={'VARIABLE': 'substitution'},
+                                        layers=[str(config_file)])
+    config = config_loader.load_lazy({'renamed': 'value'})
+    assert config['field'] == 'substitution'
+    assert config['attribute_field'] == 'value'
+
+
+def test_config_loader_load_lazy_frozen(raw_config):
+    raw_config['nested']['field'] = '4'
+    config_loader = BaseConfigLoader(ConfigSchemaTest,
+                                     substitution_mapping={'VARIABLE': 'substitution', 'VARIABLE_INT': '24'},
+                                     frozen=True)
+    config = config_loader.load_lazy(dict(raw_config, extra={'key': '${VARIABLE}'}))
+
+    assert isinstance(config['nested'], FrozenConfig)
+    assert config['nested'].field == 4
+    assert isinstance(config['extra'], FrozenConfig)
+
+    config = config_loader.load_lazy(raw_config)
+    assert isinstance(config.validate_all(), FrozenConfig)
+    assert isinstance(config['nested'], FrozenConfig)
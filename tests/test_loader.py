@@ -8,11 +8,20 @@
     :license: BSD, see :ref:`license` for more details.
 """
 
+import asyncio
+import concurrent.futures
+import os
+import pickle
+import sys
+
 import pytest
 from marshmallow import fields
 
-from cfg_loader.exceptions import ConfigFileMissingError, ConfigFileNotFoundError
-from cfg_loader.loader import BaseConfigLoader, YamlConfigLoader
+from cfg_loader.cache import ConfigCache, ParseCache
+from cfg_loader.exceptions import ConfigLoaderError, ConfigFileMissingError, ConfigFileNotFoundError, \
+    UnsupportedFormatError, ValidationError
+from cfg_loader.frozen import FrozenConfig
+from cfg_loader.loader import BaseConfigLoader, FileConfigLoader, YamlConfigLoader, LayeredConfigLoader
 from cfg_loader.schema import ConfigSchema
 from .conftest import BASE_CONFIG_PATH
 
@@ -52,6 +61,111 @@ def test_base_config_loader():
     }
 
 
+def test_base_config_loader_schema_cache():
+    config_loader = BaseConfigLoader(ConfigSchemaTest, schema_cache_size=1)
+
+    schema = config_loader.get_schema({'VARIABLE': 'value'})
+    assert config_loader.get_schema({'VARIABLE': 'value'}) is schema
+    assert schema.substitution_mapping == {'VARIABLE': 'value'}
+
+    assert config_loader.get_schema({'VARIABLE': 'other'}) is not schema
+    assert config_loader.get_schema({'VARIABLE': 'value'}) is not schema
+
+    assert config_loader.get_schema({'VARIABLE': ['unhashable']}).substitution_mapping == {
+        'VARIABLE': ['unhashable'],
+    }
+
+
+def test_base_config_loader_update_substitutions():
+    config_loader = BaseConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret', 'NAME': 'Name'},
+                                     track_substitutions=True)
+
+    with pytest.raises(ConfigLoaderError):
+        config_loader.update_substitutions({'SECRET': 'new-secret'})
+
+    config = config_loader.load({
+        'base': {
+            'name': '${NAME:-App}',
+            'path': '/home/folder',
+        },
+        'security': {
+            'secret': '${SECRET}',
+        },
+    })
+
+    new_config = config_loader.update_substitutions({'SECRET': 'new-secret', 'UNUSED': 'value'})
+    assert new_config == {
+        'base': {
+            'name': 'Name',
+            'path': '/home/folder',
+        },
+        'security': {
+            'secret': 'new-secret',
+        },
+    }
+    assert new_config['base'] is config['base']
+    assert config['security']['secret'] == 'my-secret'
+
+    assert config_loader.update_substitutions({'UNUSED': None}) is new_config
+    assert config_loader.update_substitutions({'NAME': None, 'SECRET': 'my-secret'}) == {
+        'base': {
+            'name': 'App',
+            'path': '/home/folder',
+        },
+        'security': {
+            'secret': 'my-secret',
+        },
+    }
+
+
+def test_base_config_loader_update_substitutions_deep():
+    depth = sys.getrecursionlimit() * 2
+    data = {'value': '${A}'}
+    for _ in range(depth):
+        data = {'nested': data}
+
+    config_loader = BaseConfigLoader(ConfigSchemaTest, substitution_mapping={'A': '1'}, track_substitutions=True)
+    config_loader.load({'deep': data})
+    config = config_loader.update_substitutions({'A': '3'})['deep']
+    for _ in range(depth):
+        config = config['nested']
+    assert config == {'value': '3'}
+
+
+def test_base_config_loader_untracked_substitutions():
+    config_loader = BaseConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    config_loader.load({'security': {'secret': '${SECRET}'}})
+    assert config_loader._last_load is None
+
+    with pytest.raises(ConfigLoaderError) as e:
+        config_loader.update_substitutions({'SECRET': 'new-secret'})
+    assert 'track_substitutions' in str(e.value)
+
+
+def test_base_config_loader_frozen():
+    config_loader = BaseConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'}, frozen=True,
+                                     track_substitutions=True)
+    config = config_loader.load({
+        'base': {
+            'name': 'App-Name',
+        },
+        'security': {
+            'secret': '${SECRET}',
+        },
+    })
+    assert isinstance(config, FrozenConfig)
+    assert config.security.secret == 'my-secret'
+
+    new_config = config_loader.update_substitutions({'SECRET': 'new-secret'})
+    assert isinstance(new_config, FrozenConfig)
+    assert new_config.security.secret == 'new-secret'
+    assert new_config.base is config.base
+
+    # Immutable results of shared subtrees can be shared
+    assert config_loader.get_schema({}).share_subtrees
+    assert not BaseConfigLoader(ConfigSchemaTest).get_schema({}).share_subtrees
+
+
 def test_yaml_config_loader(config_path):
     config_loader = YamlConfigLoader(ConfigSchemaTest,
                                      substitution_mapping={'PATH': 'folder/file', 'SECRET': 'my-secret'})
@@ -113,6 +227,29 @@ def test_yaml_config_loader_with_default_path(config_path):
     }
 
 
+def test_yaml_config_loader_yaml_backend(config_path):
+    config_loader = YamlConfigLoader(ConfigSchemaTest,
+                                     substitution_mapping={'PATH': 'folder/file', 'SECRET': 'my-secret'},
+                                     yaml_backend='python')
+    assert config_loader.yaml_backend == 'python'
+    assert config_loader.load(config_path)['security'] == {'secret': 'my-secret'}
+
+
+def test_file_config_loader(tmpdir):
+    config_file = tmpdir.join('config.json')
+    config_file.write('{"security": {"secret": "${SECRET}"}}')
+    config_loader = FileConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    assert config_loader.load(str(config_file)) == {'security': {'secret': 'my-secret'}}
+
+    config_file = tmpdir.join('config.conf')
+    config_file.write('security:\n  secret: ${SECRET}\n')
+    with pytest.raises(UnsupportedFormatError):
+        config_loader.load(str(config_file))
+
+    config_loader = FileConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'}, parser='yaml')
+    assert config_loader.load(str(config_file)) == {'security': {'secret': 'my-secret'}}
+
+
 def test_yaml_config_loader_invalid_path():
     config_loader = YamlConfigLoader(ConfigSchemaTest,
                                      substitution_mapping={'PATH': 'folder/file', 'SECRET': 'my-secret'}, )
@@ -120,3 +257,204 @@ def test_yaml_config_loader_invalid_path():
     with pytest.raises(ConfigFileNotFoundError) as e:
         config_loader.load('unknown/config/file')
     assert 'unknown/config/file' in str(e.value)
+
+
+def test_yaml_config_loader_result_cache(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('security:\n  secret: $SECRET\n')
+
+    result_cache = ConfigCache(maxsize=4)
+    config_loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'},
+                                     result_cache=result_cache)
+
+    config = config_loader.load(str(config_file))
+    assert config == {'security': {'secret': 'my-secret'}}
+    assert config_loader.load(str(config_file)) is config
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+    # A different substitution mapping is a different entry
+    assert config_loader.load(str(config_file), {'SECRET': 'other'}) == {'security': {'secret': 'other'}}
+    assert result_cache.misses == 2
+
+    # Modifying the file invalidates its entries
+    config_file.write('security:\n  secret: ${SECRET}-v2\n')
+    os.utime(str(config_file), ns=(0, 0))
+    assert config_loader.load(str(config_file)) == {'security': {'secret': 'my-secret-v2'}}
+
+    result_cache.invalidate_path(str(config_file))
+    assert len(result_cache) == 0
+    assert config_loader.load(str(config_file)) == {'security': {'secret': 'my-secret-v2'}}
+
+
+class IntPortSchema(ConfigSchema):
+    port = fields.Int()
+
+
+class StrPortSchema(ConfigSchema):
+    port = fields.Str()
+
+
+def test_yaml_config_loader_shared_result_cache(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write("port: '80'\n")
+
+    result_cache = ConfigCache()
+    int_loader = YamlConfigLoader(IntPortSchema, result_cache=result_cache)
+    str_loader = YamlConfigLoader(StrPortSchema, result_cache=result_cache)
+    frozen_loader = YamlConfigLoader(IntPortSchema, result_cache=result_cache, frozen=True)
+
+    assert int_loader.load(str(config_file)) == {'port': 80}
+    assert str_loader.load(str(config_file)) == {'port': '80'}
+    assert isinstance(frozen_loader.load(str(config_file)), FrozenConfig)
+    assert (result_cache.hits, result_cache.misses) == (0, 3)
+
+    # Loaders with the same schema and options share entries
+    other_loader = YamlConfigLoader(IntPortSchema, result_cache=result_cache)
+    assert other_loader.load(str(config_file)) is int_loader.load(str(config_file))
+    assert result_cache.hits == 2
+
+
+def test_yaml_config_loader_result_cache_tracked_substitutions(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('security:\n  secret: $SECRET\n')
+
+    result_cache = ConfigCache()
+    YamlConfigLoader(ConfigSchemaTest, {'SECRET': 'my-secret'}, result_cache=result_cache).load(str(config_file))
+    config_loader = YamlConfigLoader(ConfigSchemaTest, {'SECRET': 'my-secret'}, result_cache=result_cache,
+                                     track_substitutions=True)
+
+    # Untracked entries hold the configuration only and are not reused by a tracking loader
+    config = config_loader.load(str(config_file))
+    assert result_cache.misses == 2
+    assert config_loader.load(str(config_file)) is config
+    assert config_loader.update_substitutions({'SECRET': 'new-secret'}) == {'security': {'secret': 'new-secret'}}
+
+
+def test_yaml_config_loader_parse_cache(config_path, tmpdir):
+    parse_cache = ParseCache(str(tmpdir))
+    config_loader = YamlConfigLoader(ConfigSchemaTest,
+                                     substitution_mapping={'PATH': 'folder/file', 'SECRET': 'my-secret'},
+                                     parse_cache=parse_cache)
+
+    for _ in range(2):
+        assert config_loader.load(config_path) == {
+            'base': {
+                'name': 'App-Name',
+                'path': '/home/user/folder/file',
+            },
+            'security': {
+                'secret': 'my-secret',
+            },
+        }
+    assert len(tmpdir.listdir('*.pickle')) == 1
+
+
+def test_yaml_config_loader_load_all(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('security:\n  secret: ${SECRET}-1\n---\nsecurity:\n  secret: ${SECRET}-2\n---\n')
+
+    config_loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    configs = config_loader.load_all(str(config_file))
+    assert next(configs) == {'security': {'secret': 'my-secret-1'}}
+    assert list(configs) == [{'security': {'secret': 'my-secret-2'}}]
+
+    with pytest.raises(ConfigFileNotFoundError):
+        config_loader.load_all('unknown/config/file')
+
+
+def test_config_loader_aload(config_path):
+    config_loader = YamlConfigLoader(ConfigSchemaTest,
+                                     substitution_mapping={'PATH': 'folder/file', 'SECRET': 'my-secret'})
+
+    loop = asyncio.new_event_loop()
+    try:
+        config = loop.run_until_complete(config_loader.aload(config_path))
+        with pytest.raises(ConfigFileNotFoundError):
+            loop.run_until_complete(config_loader.aload('unknown/config/file'))
+    finally:
+        loop.close()
+
+    assert config == config_loader.load(config_path)
+
+
+def test_file_config_loader_pickle():
+    config_loader = YamlConfigLoader(ConfigSchemaTest, result_cache=ConfigCache())
+    config_loader.load(BASE_CONFIG_PATH, {'PATH': 'folder/file', 'SECRET': 'my-secret'})
+
+    unpickled_loader = pickle.loads(pickle.dumps(config_loader))
+    assert unpickled_loader._last_load is None
+    assert len(unpickled_loader.result_cache) == 0
+    assert unpickled_loader.load(BASE_CONFIG_PATH, {'PATH': 'folder/file', 'SECRET': 'my-secret'}) == \
+        config_loader.load(BASE_CONFIG_PATH, {'PATH': 'folder/file', 'SECRET': 'my-secret'})
+
+
+@pytest.mark.parametrize('executor_class', [concurrent.futures.ThreadPoolExecutor, None])
+def test_file_config_loader_load_many(tmpdir, executor_class):
+    for index in range(3):
+        tmpdir.join('tenant-{}.yml'.format(index)).write('security:\n  secret: ${{SECRET}}-{}\n'.format(index))
+    tmpdir.join('tenant-invalid.yml').write('security:\n  secret: [invalid]\n')
+
+    config_loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    pattern = str(tmpdir.join('tenant-*.yml'))
+    if executor_class is None:
+        result = config_loader.load_many(pattern, max_workers=2)
+    else:
+        with executor_class(max_workers=2) as executor:
+            result = config_loader.load_many(pattern, executor=executor)
+
+    assert not result.ok
+    assert list(result.configs.values()) == [{'security': {'secret': 'my-secret-{}'.format(index)}}
+                                             for index in range(3)]
+    assert list(result.errors) == [str(tmpdir.join('tenant-invalid.yml'))]
+    assert isinstance(result.errors[str(tmpdir.join('tenant-invalid.yml'))], ValidationError)
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        result = config_loader.load_many([str(tmpdir.join('tenant-0.yml')), 'unknown/config/file'], executor=executor)
+    assert isinstance(result.errors['unknown/config/file'], ConfigFileNotFoundError)
+
+
+def test_layered_config_loader(tmpdir):
+    base_file = tmpdir.join('base.yml')
+    base_file.write('base:\n  name: App-Name\n  path: /home/user\nsecurity:\n  secret: $SECRET\n')
+    overlay_file = tmpdir.join('production.json')
+    overlay_file.write('{"base": {"path": "/srv/app"}}')
+
+    config_loader = LayeredConfigLoader(ConfigSchemaTest,
+                                        layers=[str(base_file), str(overlay_file), {'base': {'name': 'Prod'}}],
+                                        substitution_mapping={'SECRET': 'my-secret'})
+
+    assert config_loader.load() == {
+        'base': {
+            'name': 'Prod',
+            'path': '/srv/app',
+        },
+        'security': {
+            'secret': 'my-secret',
+        },
+    }
+
+    # Static layers are merged once
+    merged_layers = config_loader.merge_layers()
+    assert config_loader.merge_layers() is merged_layers
+
+    assert config_loader.load({'security': {'secret': 'local'}}) == {
+        'base': {
+            'name': 'Prod',
+            'path': '/srv/app',
+        },
+        'security': {
+            'secret': 'local',
+        },
+    }
+    assert config_loader.merge_layers() is merged_layers
+
+    # Modifying a layer file merges layers again
+    overlay_file.write('{"base": {"path": "/srv/other-app"}}')
+    os.utime(str(overlay_file), ns=(0, 0))
+    assert config_loader.load()['base']['path'] == '/srv/other-app'
+
+    config_loader.invalidate()
+    assert config_loader.merge_layers() is not merged_layers
+
+    with pytest.raises(ConfigFileNotFoundError):
+        config_loader.load('unknown/config/file')
@@ -0,0 +1,69 @@
+"""
+    tests.test_parsers
+    ~~~~~~~~~~~~~~~~~~
+
+    Test parsers registry
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import pytest
+
+from cfg_loader import parsers
+from cfg_loader.exceptions import UnsupportedFormatError
+from cfg_loader.parsers import register_parser, get_parser, get_parser_name, parse_file, parse_json, PARSERS
+
+
+def test_get_parser_name():
+    assert get_parser_name('config.yml') == 'yaml'
+    assert get_parser_name('config.YAML') == 'yaml'
+    assert get_parser_name('/etc/app/config.json') == 'json'
+
+    with pytest.raises(UnsupportedFormatError):
+        get_parser_name('config.ini')
+
+
+def test_register_parser(monkeypatch):
+    monkeypatch.setattr(parsers, 'PARSERS', dict(parsers.PARSERS))
+    monkeypatch.setattr(parsers, 'EXTENSIONS', dict(parsers.EXTENSIONS))
+
+    def parse_lines(content):
+        return content.decode().splitlines()
+
+    register_parser('lines', parse_lines, extensions=['.lines'])
+    assert get_parser_name('config.lines') == 'lines'
+    assert get_parser('lines') is parse_lines
+
+    with pytest.raises(UnsupportedFormatError):
+        get_parser('unknown')
+
+
+@pytest.mark.parametrize('with_orjson', [True, False])
+def test_parse_json(monkeypatch, with_orjson):
+    if not with_orjson:
+        monkeypatch.setattr(parsers, 'orjson', None)
+    assert parse_json(b'{"key": ["one", 2]}') == {'key': ['one', 2]}
+
+
+@pytest.mark.skipif('toml' not in PARSERS, reason='no TOML library installed')
+def test_parse_toml():
+    assert get_parser('toml')(b'[section]\nkey = "value"\n') == {'section': {'key': 'value'}}
+
+
+@pytest.mark.skipif('msgpack' not in PARSERS, reason='msgpack is not installed')
+def test_parse_msgpack(tmpdir):
+    import msgpack
+
+    data = {'key': ['one', 2, {'nested': True}], 'binary': b'\x00'}
+    config_file = tmpdir.join('config.msgpack')
+    config_file.write_binary(msgpack.packb(data, use_bin_type=True))
+    assert get_parser_name(str(config_file)) == 'msgpack'
+    assert parse_file(str(config_file)) == data
+
+
+def test_parse_file(tmpdir):
+    config_file = tmpdir.join('config.json')
+    config_file.write('{"key": "value"}')
+    assert parse_file(str(config_file)) == {'key': 'value'}
+    assert parse_file(str(config_file), parser=get_parser('yaml')) == {'key': 'value'}
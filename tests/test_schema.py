@@ -12,7 +12,8 @@ import pytest
 from cfg_loader.exceptions import ValidationError
 from cfg_loader.fields import UnwrapNested
 from cfg_loader.schema import ConfigSchema
-from marshmallow import fields
+from cfg_loader.utils import parse_yaml
+from marshmallow import fields, post_load
 
 
 class NestedConfigSchemaTest(ConfigSchema):
@@ -185,3 +186,99 @@ def test_flask_config_schema_loading(flask_config_schema_loader):
             ],
         }
     }
+
+
+class DefaultsConfigSchemaTest(ConfigSchema):
+    host = fields.Str()
+    port = fields.Int()
+
+    loads = 0
+
+    @post_load
+    def count_loads(self, data):
+        DefaultsConfigSchemaTest.loads += 1
+        return data
+
+
+class ServiceConfigSchemaTest(ConfigSchema):
+    name = fields.Str()
+    db = fields.Nested(DefaultsConfigSchemaTest)
+
+
+class SharedConfigSchemaTest(ConfigSchema):
+    services = fields.List(fields.Nested(ServiceConfigSchemaTest))
+    cache = fields.Nested(DefaultsConfigSchemaTest)
+
+
+SHARED_SUBTREES_YAML = """
+    defaults: &defaults
+      db: &db
+        host: ${DB_HOST}
+        port: '5432'
+    services:
+      - <<: *defaults
+        name: first
+      - <<: *defaults
+        name: second
+      - name: third
+        db: *db
+    cache: *db
+"""
+
+
+def test_shared_subtrees_loaded_once():
+    data = parse_yaml(SHARED_SUBTREES_YAML)
+    assert data['services'][0]['db'] is data['services'][2]['db'] is data['cache']
+
+    DefaultsConfigSchemaTest.loads = 0
+    config = SharedConfigSchemaTest(substitution_mapping={'DB_HOST': 'localhost'}, share_subtrees=True).load(data)
+
+    assert [service['name'] for service in config['services']] == ['first', 'second', 'third']
+    assert config['cache'] == {'host': 'localhost', 'port': 5432}
+    assert all(service['db'] is config['cache'] for service in config['services'])
+    assert DefaultsConfigSchemaTest.loads == 1
+
+    # Memo is not kept across loads
+    SharedConfigSchemaTest(share_subtrees=True).load({'cache': {'host': 'other', 'port': '1'}})
+    assert DefaultsConfigSchemaTest.loads == 2
+
+    with pytest.raises(ValidationError):
+        SharedConfigSchemaTest(share_subtrees=True).load({'cache': {'port': 'invalid'}})
+    assert SharedConfigSchemaTest(share_subtrees=True).load({'cache': {'port': '1'}}) == {'cache': {'port': 1}}
+
+
+def test_shared_subtrees_independent_by_default():
+    data = parse_yaml(SHARED_SUBTREES_YAML)
+
+    DefaultsConfigSchemaTest.loads = 0
+    config = SharedConfigSchemaTest(substitution_mapping={'DB_HOST': 'localhost'}).load(data)
+    assert DefaultsConfigSchemaTest.loads == 4
+
+    config['services'][0]['db']['host'] = 'other'
+    assert config['cache'] == {'host': 'localhost', 'port': 5432}
+
+
+class SharedOptionsConfigSchemaTest(ConfigSchema):
+    db = fields.Nested(DefaultsConfigSchemaTest)
+    db_without_port = fields.Nested(DefaultsConfigSchemaTest(dump_only=('port',)))
+    db_with_context = fields.Nested(DefaultsConfigSchemaTest)
+
+
+def test_shared_subtrees_schema_options():
+    data = parse_yaml("""
+        db: &db
+          host: localhost
+          port: '5432'
+        db_without_port: *db
+        db_with_context: *db
+    """)
+
+    schema = SharedOptionsConfigSchemaTest(share_subtrees=True)
+    schema.fields['db_with_context'].schema.context = {'key': 'value'}
+    DefaultsConfigSchemaTest.loads = 0
+    config = schema.load(data)
+
+    assert config['db'] == {'host': 'localhost', 'port': 5432}
+    assert config['db_without_port'] == {'host': 'localhost'}
+    assert config['db_with_context'] is not config['db']
+    assert DefaultsConfigSchemaTest.loads == 3
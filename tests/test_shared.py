@@ -0,0 +1,105 @@
+"""
+    tests.test_shared
+    ~~~~~~~~~~~~~~~~~
+
+    Test shared memory configuration publication
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cfg_loader.exceptions import ConfigLoaderError
+from cfg_loader.frozen import freeze
+from cfg_loader import shared
+from cfg_loader.shared import SharedConfigPublisher, SharedConfigReader, GENERATION
+
+
+READER_SCRIPT = """
+import sys
+from cfg_loader.shared import SharedConfigReader
+with SharedConfigReader(sys.argv[1]) as reader:
+    print(reader.get()['setting'])
+"""
+
+
+def _read_config(name, queue):
+    with SharedConfigReader(name) as reader:
+        queue.put((reader.get(), reader.generation))
+
+
+def test_shared_config():
+    with SharedConfigPublisher(size=1024) as publisher:
+        with SharedConfigReader(publisher.name) as reader:
+            assert reader.get() is None
+
+            assert publisher.publish(freeze({'setting': 'value'})) == 2
+            config = reader.get()
+            assert config == {'setting': 'value'}
+            assert reader.get() is config
+
+            publisher.publish({'setting': 'other'})
+            assert reader.get() == {'setting': 'other'}
+            assert reader.generation == 4
+
+        with pytest.raises(ConfigLoaderError):
+            publisher.publish({'setting': 'x' * 2048})
+
+
+def test_shared_config_publication_in_progress(monkeypatch):
+    with SharedConfigPublisher(size=1024) as publisher:
+        publisher.publish({'setting': 'value'})
+        with SharedConfigReader(publisher.name) as reader:
+            # Publication of a new generation started but payload is not copied yet
+            GENERATION.pack_into(publisher._shm.buf, 0, publisher.generation + 1)
+
+            delays = []
+
+            def sleep(delay):
+                delays.append(delay)
+                if len(delays) == 3:
+                    publisher.publish({'setting': 'other'})
+
+            monkeypatch.setattr(shared.time, 'sleep', sleep)
+            assert reader.get() == {'setting': 'other'}
+            assert reader.generation == 4
+            assert delays == sorted(delays) and delays[0] < delays[-1]
+
+            GENERATION.pack_into(publisher._shm.buf, 0, publisher.generation + 1)
+            monkeypatch.setattr(shared, 'MAX_READ_ATTEMPTS', 5)
+            with pytest.raises(ConfigLoaderError):
+                reader.get()
+
+
+def test_shared_config_worker_process():
+    context = multiprocessing.get_context()
+    queue = context.Queue()
+    with SharedConfigPublisher() as publisher:
+        publisher.publish({'setting': 'value'})
+        process = context.Process(target=_read_config, args=(publisher.name, queue))
+        process.start()
+        assert queue.get(timeout=10) == ({'setting': 'value'}, 2)
+        process.join(10)
+
+
+def test_shared_config_unrelated_process():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with SharedConfigPublisher() as publisher:
+        publisher.publish({'setting': 'value'})
+        for _ in range(2):
+            # Segment must outlive reader processes and their resource tracker
+            result = subprocess.run([sys.executable, '-c', READER_SCRIPT, publisher.name], cwd=root,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                                    timeout=30)
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.strip() == 'value'
+            assert 'leaked' not in result.stderr
+
+        with SharedConfigReader(publisher.name) as reader:
+            assert reader.get() == {'setting': 'value'}
@@ -10,7 +10,8 @@
 
 import pytest
 
-from cfg_loader.utils import parse_yaml, parse_yaml_file, add_prefix
+from cfg_loader.utils import parse_yaml, parse_yaml_documents, parse_yaml_file, add_prefix, mapping_fingerprint, \
+    get_yaml_backend, map_file, deep_merge, YAML_LOADERS, DEFAULT_YAML_BACKEND
 
 
 def test_parse_yaml():
@@ -22,6 +23,27 @@ def test_parse_yaml():
     """) is not None
 
 
+@pytest.mark.parametrize('backend', sorted(YAML_LOADERS))
+def test_parse_yaml_backend(backend):
+    assert parse_yaml('key: [one, two]', backend=backend) == {'key': ['one', 'two']}
+
+
+def test_get_yaml_backend(monkeypatch):
+    assert get_yaml_backend() == DEFAULT_YAML_BACKEND
+    assert get_yaml_backend('python') == 'python'
+    with pytest.raises(ValueError):
+        get_yaml_backend('unknown')
+
+    monkeypatch.delitem(YAML_LOADERS, 'libyaml', raising=False)
+    assert get_yaml_backend('libyaml') == 'python'
+
+
+def test_parse_yaml_documents():
+    documents = parse_yaml_documents('key: one\n---\nkey: two\n')
+    assert next(documents) == {'key': 'one'}
+    assert list(documents) == [{'key': 'two'}]
+
+
 def test_parse_yaml_file(config_path):
     with pytest.raises(TypeError):
         parse_yaml_file(None)
@@ -32,6 +54,25 @@ def test_parse_yaml_file(config_path):
     assert parse_yaml_file(config_path)
 
 
+def test_map_file(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('key: value')
+    with map_file(str(config_file)) as content:
+        assert content[:] == b'key: value'
+        assert parse_yaml(content) == {'key': 'value'}
+
+    empty_file = tmpdir.join('empty.yml')
+    empty_file.write('')
+    with map_file(str(empty_file)) as content:
+        assert content == b''
+
+    # Errors raised while using the content are not chained to the mmap failure
+    with pytest.raises(KeyError) as e:
+        with map_file(str(empty_file)):
+            raise KeyError('key')
+    assert e.value.__context__ is None
+
+
 def test_add_prefix():
     raw_dict = {
         'key1': 'value1',
@@ -45,3 +86,45 @@ def test_add_prefix():
             'key3': 'value3'
         },
     }
+
+
+def test_mapping_fingerprint():
+    assert mapping_fingerprint({'key1': 'value1', 'key2': 'value2'}) == mapping_fingerprint({
+        'key2': 'value2',
+        'key1': 'value1',
+    })
+    assert mapping_fingerprint({'key': 'value'}) != mapping_fingerprint({'key': 'other'})
+    assert mapping_fingerprint({'key': ['unhashable']}) is None
+
+
+def test_deep_merge():
+    base = {
+        'key1': 'value1',
+        'key2': {
+            'key3': 'value3',
+            'key4': ['element'],
+        },
+        'key5': {
+            'key6': 'value6',
+        },
+    }
+    override = {
+        'key2': {
+            'key4': ['other'],
+        },
+        'key7': 'value7',
+    }
+    merged = deep_merge(base, override)
+    assert merged == {
+        'key1': 'value1',
+        'key2': {
+            'key3': 'value3',
+            'key4': ['other'],
+        },
+        'key5': {
+            'key6': 'value6',
+        },
+        'key7': 'value7',
+    }
+    assert merged['key5'] is base['key5']
+    assert base['key2']['key4'] == ['element']
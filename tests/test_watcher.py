@@ -0,0 +1,133 @@
+"""
+    tests.test_watcher
+    ~~~~~~~~~~~~~~~~~~
+
+    Test configuration file watcher
+
+    :copyright: Copyright 2017 by ConsenSys France.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import asyncio
+import os
+import queue
+
+import pytest
+from marshmallow import fields
+
+from cfg_loader.loader import YamlConfigLoader
+from cfg_loader.schema import ConfigSchema
+from cfg_loader.watcher import ConfigWatcher, AsyncConfigWatcher, InotifyBackend, PollingBackend
+
+
+class ConfigSchemaTest(ConfigSchema):
+    secret = fields.Str()
+
+
+def test_polling_backend(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('secret: one')
+
+    backend = PollingBackend(str(config_file), interval=0.01)
+    assert not backend.wait(0.02)
+
+    config_file.write('secret: two, longer')
+    assert backend.wait(0.02)
+    assert not backend.wait(0.02)
+
+
+@pytest.mark.parametrize('use_inotify', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not InotifyBackend.is_available(), reason='inotify unavailable')),
+])
+def test_config_watcher(tmpdir, use_inotify):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('secret: ${SECRET}-1')
+
+    loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    watcher = ConfigWatcher(loader, str(config_file), debounce=0.05, interval=0.05, use_inotify=use_inotify)
+
+    configs, errors = queue.Queue(), queue.Queue()
+    watcher.subscribe(configs.put)
+    watcher.on_error(errors.put)
+
+    with watcher:
+        assert configs.get(timeout=1) == {'secret': 'my-secret-1'}
+        assert watcher.config == {'secret': 'my-secret-1'}
+
+        # Atomically replace the file
+        new_file = tmpdir.join('config.yml.new')
+        new_file.write('secret: ${SECRET}-2')
+        os.replace(str(new_file), str(config_file))
+        assert configs.get(timeout=5) == {'secret': 'my-secret-2'}
+        assert watcher.config == {'secret': 'my-secret-2'}
+        assert watcher.generation == 2
+
+        # Invalid content keeps the previous configuration
+        config_file.write('secret: [invalid')
+        assert errors.get(timeout=5) is not None
+        assert watcher.config == {'secret': 'my-secret-2'}
+
+    assert watcher._thread is None
+
+
+def test_async_config_watcher(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('secret: ${SECRET}-1')
+
+    loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+
+    async def watch():
+        configs = []
+        async with AsyncConfigWatcher(loader, str(config_file), debounce=0.05, interval=0.05) as watcher:
+            async for config in watcher:
+                configs.append(config)
+                if len(configs) == 1:
+                    config_file.write('secret: ${SECRET}-2')
+                else:
+                    break
+        return configs, watcher
+
+    loop = asyncio.new_event_loop()
+    try:
+        configs, watcher = loop.run_until_complete(asyncio.wait_for(watch(), 5))
+    finally:
+        loop.close()
+
+    assert configs == [{'secret': 'my-secret-1'}, {'secret': 'my-secret-2'}]
+    assert watcher.generation == 2
+
+
+def test_async_config_watcher_errors(tmpdir):
+    config_file = tmpdir.join('config.yml')
+    config_file.write('secret: ${SECRET}-1')
+
+    loader = YamlConfigLoader(ConfigSchemaTest, substitution_mapping={'SECRET': 'my-secret'})
+    errors = []
+
+    def failing_callback(error):
+        errors.append(error)
+        config_file.write('secret: ${SECRET}-valid')
+        raise RuntimeError('Callback failure')
+
+    async def watch():
+        configs = []
+        async with AsyncConfigWatcher(loader, str(config_file), debounce=0.05, interval=0.05) as watcher:
+            watcher.on_error(failing_callback)
+            async for config in watcher:
+                configs.append(config)
+                if len(configs) == 1:
+                    config_file.write('secret: [invalid')
+                else:
+                    break
+        return configs
+
+    loop = asyncio.new_event_loop()
+    try:
+        configs = loop.run_until_complete(asyncio.wait_for(watch(), 5))
+    finally:
+        loop.close()
+
+    # A failing error subscriber does not end the iteration
+    assert configs == [{'secret': 'my-secret-1'}, {'secret': 'my-secret-valid'}]
+    assert len(errors) == 1